@@ -0,0 +1 @@
+"""Benchmarks of the Xiaomi Viomi integration against simulated devices."""
@@ -0,0 +1,270 @@
+"""Benchmark polling and commands against simulated Viomi devices.
+
+Run with `python -m benchmarks.bench_polling`, see `--help` for options.
+Everything runs on localhost, no network access or real device is needed.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, List, Optional, Sequence
+
+from custom_components.xiaomi_viomi.const import (
+    DEFAULT_MAX_CONCURRENT_POLLS,
+    DEFAULT_TIMEOUT,
+    DEVICE_PROPERTIES,
+    DEVICE_PROPERTIES_FAST,
+)
+from custom_components.xiaomi_viomi.device import PatchedViomiVacuum
+from custom_components.xiaomi_viomi.scheduler import ViomiPollScheduler
+from custom_components.xiaomi_viomi.status import ViomiStatusSnapshot
+
+from .simulator import SIMULATED_TOKEN, async_start_simulator
+
+DEFAULT_ROBOTS = (1, 5, 10, 25, 50)
+# Every n-th poll requests all properties, like the slow tier does
+FULL_POLL_EVERY = 10
+
+
+class ExecutorMonitor(ThreadPoolExecutor):
+    """Executor accounting the jobs it runs and how long they take."""
+
+    def __init__(self, max_workers: int = 8) -> None:
+        """Initialize the executor."""
+        super().__init__(max_workers=max_workers)
+        self.workers = max_workers
+        self.jobs = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        """Run a job and add its duration to the busy time."""
+
+        def timed() -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.busy += time.perf_counter() - started
+
+        self.jobs += 1
+        return super().submit(timed)
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of a run with a number of robots."""
+
+    robots: int
+    poll_p50_ms: float
+    poll_p95_ms: float
+    poll_max_ms: float
+    round_ms: float
+    commands_per_second: float
+    executor_jobs: int
+    executor_occupancy: float
+    memory_per_robot_kib: float
+    timeouts: int
+    retries: int
+
+
+async def _async_poll(device: PatchedViomiVacuum, full: bool) -> ViomiStatusSnapshot:
+    """Poll like the coordinator, with or without the slow tier."""
+    if not full:
+        values = await device.get_properties_batched(DEVICE_PROPERTIES_FAST)
+        return ViomiStatusSnapshot(dict(zip(DEVICE_PROPERTIES_FAST, values)))
+
+    values, _, _ = await asyncio.gather(
+        device.get_properties_batched(DEVICE_PROPERTIES),
+        device.consumable_status(),
+        device.dnd_status(),
+    )
+    return ViomiStatusSnapshot(dict(zip(DEVICE_PROPERTIES, values)))
+
+
+def _percentile(values: Sequence[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def async_run_benchmark(
+    robots: int,
+    rounds: int = 20,
+    commands: int = 20,
+    rtt: float = 0.02,
+    jitter: float = 0.005,
+    loss: float = 0.0,
+    max_properties: Optional[int] = None,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT_POLLS,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> BenchmarkResult:
+    """Poll and command `robots` simulated devices and measure it."""
+    loop = asyncio.get_running_loop()
+    executor = ExecutorMonitor()
+    loop.set_default_executor(executor)
+
+    simulators = [
+        await async_start_simulator(
+            device_id=index + 1,
+            rtt=rtt,
+            jitter=jitter,
+            loss=loss,
+            max_properties=max_properties,
+            seed=index,
+        )
+        for index in range(robots)
+    ]
+
+    # Warm up lazily built parsers and caches, they are shared by all devices
+    warmup = PatchedViomiVacuum(ip="127.0.0.1", token=SIMULATED_TOKEN)
+    warmup.transport.port = simulators[0][2]
+    await _async_poll(warmup, full=True)
+    warmup.close()
+
+    # Memory of the devices with their session and state
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    devices = []
+    state = []
+    for _, _, port in simulators:
+        device = PatchedViomiVacuum(
+            ip="127.0.0.1", token=SIMULATED_TOKEN, timeout=timeout
+        )
+        device.transport.port = port
+        devices.append(device)
+    for device in devices:
+        state.append(await _async_poll(device, full=True))
+    gc.collect()
+    memory = (tracemalloc.get_traced_memory()[0] - before) / robots
+    tracemalloc.stop()
+
+    scheduler = ViomiPollScheduler(max_concurrent)
+    latencies: List[float] = []
+    round_times: List[float] = []
+
+    async def poll(index: int, full: bool) -> None:
+        key = str(index)
+        async with scheduler.async_poll(key):
+            started = time.perf_counter()
+            await _async_poll(devices[index], full)
+            latencies.append(time.perf_counter() - started)
+
+    for index in range(robots):
+        scheduler.async_register(str(index))
+    started_at = time.perf_counter()
+    for round_index in range(rounds):
+        started = time.perf_counter()
+        full = round_index % FULL_POLL_EVERY == 0
+        await asyncio.gather(*(poll(index, full) for index in range(robots)))
+        round_times.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            device.set_fan_speed(speed % 4)
+            for device in devices
+            for speed in range(commands)
+        )
+    )
+    commands_time = time.perf_counter() - started
+    wall = time.perf_counter() - started_at
+
+    for device in devices:
+        device.close()
+    for server, _, _ in simulators:
+        server.close()
+    executor.shutdown()
+
+    return BenchmarkResult(
+        robots=robots,
+        poll_p50_ms=round(statistics.median(latencies) * 1000, 2),
+        poll_p95_ms=round(_percentile(latencies, 0.95) * 1000, 2),
+        poll_max_ms=round(max(latencies) * 1000, 2),
+        round_ms=round(statistics.mean(round_times) * 1000, 2),
+        commands_per_second=round(robots * commands / commands_time, 1),
+        executor_jobs=executor.jobs,
+        executor_occupancy=round(executor.busy / (wall * executor.workers), 4),
+        memory_per_robot_kib=round(memory / 1024, 1),
+        timeouts=sum(device.transport.metrics.timeouts for device in devices),
+        retries=sum(device.transport.metrics.retries for device in devices),
+    )
+
+
+def run_benchmark(robots: int, **kwargs: Any) -> BenchmarkResult:
+    """Run a benchmark in its own event loop.
+
+    The loop comes from the default policy, Home Assistant's policy doesn't
+    allow replacing the executor, which is how executor jobs are counted.
+    """
+    loop = asyncio.DefaultEventLoopPolicy().new_event_loop()
+    try:
+        return loop.run_until_complete(async_run_benchmark(robots, **kwargs))
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def _print_table(results: Sequence[BenchmarkResult]) -> None:
+    columns = list(asdict(results[0]))
+    rows = [[str(value) for value in asdict(result).values()] for result in results]
+    widths = [
+        max(len(column), *(len(row[index]) for row in rows))
+        for index, column in enumerate(columns)
+    ]
+    for row in [columns, *rows]:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the benchmark for each number of robots and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--robots",
+        default=",".join(map(str, DEFAULT_ROBOTS)),
+        help="comma separated numbers of robots",
+    )
+    parser.add_argument("--rounds", type=int, default=20, help="polls per robot")
+    parser.add_argument("--commands", type=int, default=20, help="per robot")
+    parser.add_argument("--rtt", type=float, default=20, help="milliseconds")
+    parser.add_argument("--jitter", type=float, default=5, help="milliseconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="0 to 1")
+    parser.add_argument("--max-properties", type=int, help="per get_prop")
+    parser.add_argument(
+        "--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT_POLLS
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = [
+        run_benchmark(
+            int(robots),
+            rounds=args.rounds,
+            commands=args.commands,
+            rtt=args.rtt / 1000,
+            jitter=args.jitter / 1000,
+            loss=args.loss,
+            max_properties=args.max_properties,
+            max_concurrent=args.max_concurrent,
+            timeout=args.timeout,
+        )
+        for robots in args.robots.split(",")
+    ]
+    _print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump([asdict(result) for result in results], file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
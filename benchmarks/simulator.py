@@ -0,0 +1,172 @@
+"""Simulated Viomi vacuum speaking miIO over UDP on localhost."""
+import asyncio
+import random
+import struct
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from construct.core import ConstructError
+from miio.protocol import Message
+
+SIMULATED_TOKEN = "ffffffffffffffffffffffffffffffff"
+
+DEFAULT_STATE = {
+    "battary_life": 100,
+    "box_type": 1,
+    "err_state": 0,
+    "has_map": 1,
+    "has_newmap": 0,
+    "is_charge": 0,
+    "is_mop": 0,
+    "is_work": 1,
+    "light_state": 1,
+    "mode": 0,
+    "mop_type": 0,
+    "order_time": "0",
+    "remember_map": 1,
+    "repeat_state": 0,
+    "run_state": 5,
+    "s_area": 11.96,
+    "s_time": 20,
+    "start_time": 0,
+    "suction_grade": 0,
+    "v_state": 10,
+    "water_grade": 12,
+    "zone_data": "0",
+}
+
+# Commands changing a single property, with the property they change
+SETTERS = {
+    "set_suction": "suction_grade",
+    "set_suction_grade": "suction_grade",
+    "set_water_grade": "water_grade",
+    "set_light": "light_state",
+    "set_repeat": "repeat_state",
+}
+
+
+class SimulatedViomi(asyncio.DatagramProtocol):
+    """Answer miIO hello and requests like a Viomi vacuum would.
+
+    Every answer is delayed by `rtt` plus or minus up to `jitter` seconds,
+    and requests are dropped with probability `loss`. Firmware which can't
+    answer more than `max_properties` properties per get_prop is emulated
+    with the same error real devices send.
+    """
+
+    def __init__(
+        self,
+        device_id: int = 1,
+        token: str = SIMULATED_TOKEN,
+        rtt: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        max_properties: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initialize the device with the default state."""
+        self.device_id = device_id.to_bytes(4, "big")
+        self.token = bytes.fromhex(token)
+        self.rtt = rtt
+        self.jitter = jitter
+        self.loss = loss
+        self.max_properties = max_properties
+        self.state: Dict[str, Any] = dict(DEFAULT_STATE)
+
+        self.requests = 0
+        self.dropped = 0
+        self._random = random.Random(seed)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport) -> None:
+        """Keep the endpoint to answer with."""
+        self._transport = transport
+
+    def _delay(self) -> float:
+        return max(0.0, self.rtt + self._random.uniform(-self.jitter, self.jitter))
+
+    def _send_later(self, data: bytes, addr: Tuple[str, int]) -> None:
+        delay = self._delay()
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self._send, data, addr)
+        else:
+            self._send(data, addr)
+
+    def _send(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if self._transport is not None and not self._transport.is_closing():
+            self._transport.sendto(data, addr)
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        """Answer a hello or a request."""
+        if self.loss and self._random.random() < self.loss:
+            self.dropped += 1
+            return
+
+        if len(data) == 32:
+            ts = int(datetime.utcnow().timestamp())
+            hello = struct.pack(">HHI4sI", 0x2131, 32, 0, self.device_id, ts)
+            self._send_later(hello + b"\xff" * 16, addr)
+            return
+
+        try:
+            request = Message.parse(data, token=self.token).data.value
+        except ConstructError:
+            return
+        if not isinstance(request, dict) or "method" not in request:
+            return
+
+        self.requests += 1
+        try:
+            payload = {"result": self.handle(request["method"], request["params"])}
+        except ValueError:
+            payload = {"error": {"code": -5001, "message": "invalid_arg"}}
+        self._send_later(self._build(request["id"], payload), addr)
+
+    def handle(self, method: str, params: List[Any]) -> Any:
+        """Return the result of a command, ValueError for rejected ones."""
+        if method == "get_prop":
+            if self.max_properties is not None and len(params) > self.max_properties:
+                raise ValueError(method)
+            return [self.state.get(name) for name in params]
+        if method == "get_consumables":
+            return [120, 80, 40, 20, 0]
+        if method == "get_notdisturb":
+            return [0, 22, 0, 8, 0]
+        if method == "miIO.info":
+            return {"model": "viomi.vacuum.v8", "fw_ver": "3.5.8_0021"}
+        if method == "set_mode_withroom":
+            self.state["run_state"] = 3
+        elif method == "set_mode":
+            # The last parameter is the mode: 0 stop, 1 clean, 2 pause
+            self.state["run_state"] = {0: 1, 1: 3, 2: 1}.get(params[-1], 3)
+        elif method == "set_charge":
+            self.state["run_state"] = 4
+        elif method in SETTERS:
+            self.state[SETTERS[method]] = params[0]
+        return ["ok"]
+
+    def _build(self, request_id: int, payload: Dict[str, Any]) -> bytes:
+        header = {
+            "length": 0,
+            "unknown": 0,
+            "device_id": self.device_id,
+            "ts": datetime.utcnow(),
+        }
+        message = {
+            "data": {"value": {"id": request_id, **payload}},
+            "header": {"value": header},
+            "checksum": 0,
+        }
+        return Message.build(message, token=self.token)
+
+
+async def async_start_simulator(
+    **kwargs: Any,
+) -> Tuple[asyncio.DatagramTransport, SimulatedViomi, int]:
+    """Start a simulated device on a free localhost port."""
+    device = SimulatedViomi(**kwargs)
+    server, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: device, local_addr=("127.0.0.1", 0)
+    )
+    server = cast(asyncio.DatagramTransport, server)
+    return server, device, server.get_extra_info("sockname")[1]
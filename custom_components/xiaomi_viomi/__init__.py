@@ -1,5 +1,7 @@
 """Xiaomi Viomi integration."""
 import asyncio
+import logging
+from typing import Optional
 
 import voluptuous as vol
 from homeassistant.components.vacuum import PLATFORM_SCHEMA
@@ -7,22 +9,100 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_TOKEN, DEVICE_DEFAULT_NAME
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN  # noqa: F401
+from .capabilities import async_get_capability_store
+from .const import (
+    CONF_MAX_CONCURRENT_POLLS,
+    CONF_MAX_PROPERTIES,
+    DATA_SCHEDULER,
+    DEFAULT_MAX_CONCURRENT_POLLS,
+    DEFAULT_MAX_PROPERTIES,
+    DOMAIN,
+)
+from .coordinator import ViomiDataUpdateCoordinator
+from .device import PatchedViomiVacuum
+from .scheduler import ViomiPollScheduler
+from .session import async_get_session_cache
+from .websocket import async_register_websocket_commands
+
+_LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["vacuum"]
+PLATFORMS = ["vacuum", "sensor"]
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Optional(CONF_NAME, default=DEVICE_DEFAULT_NAME): cv.string,
         vol.Required(CONF_TOKEN): cv.string,
         vol.Required(CONF_HOST): cv.string,
+        vol.Optional(CONF_MAX_PROPERTIES): vol.All(int, vol.Range(min=1)),
     }
 )
 
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_POLLS, default=DEFAULT_MAX_CONCURRENT_POLLS
+                ): vol.All(int, vol.Range(min=1)),
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Xiaomi Viomi integration."""
+    conf = config.get(DOMAIN, {})
+    hass.data[DATA_SCHEDULER] = ViomiPollScheduler(
+        conf.get(CONF_MAX_CONCURRENT_POLLS, DEFAULT_MAX_CONCURRENT_POLLS)
+    )
+    async_register_websocket_commands(hass)
+    return True
+
+
+async def async_setup_coordinator(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    device: Optional[PatchedViomiVacuum] = None,
+) -> ViomiDataUpdateCoordinator:
+    """Create the coordinator polling the device of a config entry.
+
+    A device already connected while validating the config is reused,
+    otherwise a new one is created.
+    """
+    host = entry.data.get(CONF_HOST)
+    token = entry.data.get(CONF_TOKEN)
+    max_properties = entry.data.get(CONF_MAX_PROPERTIES, DEFAULT_MAX_PROPERTIES)
+
+    if device is None:
+        _LOGGER.debug("Initializing viomi with host %s (token %s...)", host, token[:5])
+        device = PatchedViomiVacuum(ip=host, token=token, max_properties=max_properties)
+        sessions = await async_get_session_cache(hass)
+        sessions.attach(device)
+    else:
+        device.max_properties = max(1, max_properties)
+
+    capabilities = await async_get_capability_store(hass)
+
+    coordinator = ViomiDataUpdateCoordinator(hass, device, entry, capabilities)
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+
+    # Don't hold up startup, entities restore their state until this is in
+    hass.async_create_task(coordinator.async_refresh())
+
+    return coordinator
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Xiaomi Viomi from a config entry."""
+    await async_setup_coordinator(hass, entry)
+    # Update listeners are only weakly referenced, a closure defined here
+    # would be garbage collected and address changes silently ignored
+    entry.async_on_unload(entry.add_update_listener(async_entry_updated))
+
     for component in PLATFORMS:
         hass.async_create_task(
             hass.config_entries.async_forward_entry_setup(entry, component)
@@ -31,9 +111,19 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_entry_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply an updated config entry.
+
+    Listeners are called for every data update, e.g. the model migration.
+    A new address is taken over live.
+    """
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.async_set_host(entry.data[CONF_HOST])
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
-    return all(
+    unload_ok = all(
         await asyncio.gather(
             *[
                 hass.config_entries.async_forward_entry_unload(entry, component)
@@ -41,3 +131,10 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
             ]
         )
     )
+
+    if unload_ok:
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator.async_shutdown_scheduling()
+        coordinator.device.close()
+
+    return unload_ok
@@ -0,0 +1,50 @@
+"""Circuit breaker for unreachable devices of Xiaomi Viomi integration."""
+import random
+from datetime import timedelta
+
+from .const import BACKOFF_MAX, BACKOFF_MIN, BREAKER_FAILURE_THRESHOLD
+
+
+class ViomiCircuitBreaker:
+    """Track failed polls of a device and back off once it is unreachable.
+
+    After `threshold` failures in a row the circuit opens: instead of full
+    polls, the device only gets a single probe per backoff period. The
+    period doubles with every failed probe up to `maximum`, and is jittered
+    so devices which went away together don't come back in lockstep.
+    """
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_FAILURE_THRESHOLD,
+        minimum: timedelta = BACKOFF_MIN,
+        maximum: timedelta = BACKOFF_MAX,
+    ) -> None:
+        """Initialize a closed circuit."""
+        self.threshold = max(1, threshold)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.failures = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether the device is considered unreachable."""
+        return self.failures >= self.threshold
+
+    def record_success(self) -> bool:
+        """Close the circuit, return whether it was open."""
+        was_open = self.is_open
+        self.failures = 0
+        return was_open
+
+    def record_failure(self) -> bool:
+        """Count a failure, return whether this opened the circuit."""
+        self.failures += 1
+        return self.failures == self.threshold
+
+    def backoff(self) -> timedelta:
+        """Return the delay until the next probe while the circuit is open."""
+        exponent = min(max(self.failures - self.threshold, 0), 16)
+        delay = min(self.minimum * 2**exponent, self.maximum)
+        # Equal jitter: at least half of the delay, the rest at random
+        return delay / 2 + delay / 2 * random.random()
@@ -0,0 +1,134 @@
+"""Persistent property capabilities for Xiaomi Viomi integration."""
+import logging
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DATA_CAPABILITIES,
+    DEVICE_PROPERTIES,
+    PRUNE_AFTER_PROBES,
+    SESSION_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = "xiaomi_viomi.capabilities"
+
+# Requested even if the device never answered it, firmware changes are
+# detected with it
+FIRMWARE_PROPERTY = "sw_info"
+
+
+def _capability_key(model: Optional[str], firmware: Any) -> str:
+    return f"{model}:{firmware}"
+
+
+def null_probes(
+    previous: Mapping[str, int], properties: Mapping[str, Any]
+) -> Dict[str, int]:
+    """Return in how many full polls in a row each property was null."""
+    return {
+        name: previous.get(name, 0) + 1
+        for name in DEVICE_PROPERTIES
+        if properties.get(name) is None
+    }
+
+
+def pruned_probes(supported: Optional[FrozenSet[str]]) -> Dict[str, int]:
+    """Return the null probes of properties left out of a stored probe."""
+    if supported is None:
+        return {}
+    return {
+        name: PRUNE_AFTER_PROBES for name in DEVICE_PROPERTIES if name not in supported
+    }
+
+
+def supported_properties(probes: Mapping[str, int]) -> FrozenSet[str]:
+    """Return the properties which weren't null in the last full polls."""
+    return frozenset(
+        name
+        for name in DEVICE_PROPERTIES
+        if probes.get(name, 0) < PRUNE_AFTER_PROBES or name == FIRMWARE_PROPERTY
+    )
+
+
+def prune(properties: List[str], supported: Optional[FrozenSet[str]]) -> List[str]:
+    """Return the properties to request, all of them if nothing was probed."""
+    if supported is None:
+        return properties
+    return [name for name in properties if name in supported]
+
+
+class ViomiCapabilityStore:
+    """Remember the properties supported per model and firmware.
+
+    Every full poll is a probe: properties answered with null in several
+    full polls in a row are not supported by the firmware and are left out
+    of the fast polls. The firmware last seen per device is kept as well, so
+    fast polls are pruned right after a restart, before the device has
+    reported its firmware again.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._models: Dict[str, List[str]] = {}
+        self._firmware: Dict[str, Any] = {}
+
+    async def async_load(self) -> None:
+        """Load probed capabilities from storage."""
+        data = await self._store.async_load()
+        if data:
+            self._models = data.get("models", {})
+            self._firmware = data.get("firmware", {})
+
+    def _data(self) -> Dict[str, Any]:
+        return {"models": self._models, "firmware": self._firmware}
+
+    def firmware(self, device: str) -> Any:
+        """Return the firmware last reported by a device, known by its MAC."""
+        return self._firmware.get(device)
+
+    def get(self, model: Optional[str], firmware: Any) -> Optional[FrozenSet[str]]:
+        """Return the supported properties, None if they weren't probed."""
+        supported = self._models.get(_capability_key(model, firmware))
+        return frozenset(supported) if supported is not None else None
+
+    @callback
+    def async_set(
+        self,
+        device: str,
+        model: Optional[str],
+        firmware: Any,
+        supported: Optional[FrozenSet[str]] = None,
+    ) -> None:
+        """Record the firmware of a device and what it supports."""
+        changed = self._firmware.get(device) != firmware
+        self._firmware[device] = firmware
+        key = _capability_key(model, firmware)
+        if supported is not None and self._models.get(key) != sorted(supported):
+            _LOGGER.debug(
+                "%s with firmware %s supports %s of %s properties",
+                model,
+                firmware,
+                len(supported),
+                len(DEVICE_PROPERTIES),
+            )
+            self._models[key] = sorted(supported)
+            changed = True
+
+        if changed:
+            self._store.async_delay_save(self._data, SESSION_SAVE_DELAY)
+
+
+async def async_get_capability_store(hass: HomeAssistant) -> ViomiCapabilityStore:
+    """Return the capability store shared by all Viomi devices."""
+    if DATA_CAPABILITIES not in hass.data:
+        store = ViomiCapabilityStore(hass)
+        await store.async_load()
+        hass.data[DATA_CAPABILITIES] = store
+
+    return hass.data[DATA_CAPABILITIES]
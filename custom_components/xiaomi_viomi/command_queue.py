@@ -0,0 +1,97 @@
+"""Command queue for Xiaomi Viomi integration."""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, List, Optional
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _QueuedCommand:
+    """A command waiting to be sent and everyone waiting for its result."""
+
+    __slots__ = ("func", "args", "waiters")
+
+    def __init__(
+        self, func: Callable[..., Awaitable[Any]], args: tuple, waiters: List
+    ) -> None:
+        self.func = func
+        self.args = args
+        self.waiters = waiters
+
+
+class ViomiCommandQueue:
+    """Send commands to a device one by one, ahead of polling.
+
+    Commands queued with the same key write the same setting, so only the
+    last of them is sent and all callers get its result. Once the queue
+    drains, `on_drained` is scheduled once for the whole burst.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, on_drained: Callable[[], Awaitable[None]]
+    ) -> None:
+        """Initialize the queue."""
+        self._hass = hass
+        self._on_drained = on_drained
+        self._pending: "OrderedDict[Hashable, _QueuedCommand]" = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def is_idle(self) -> bool:
+        """Return True if no command is queued or being sent."""
+        return self._idle.is_set()
+
+    async def async_wait_idle(self) -> None:
+        """Wait until all queued commands have been sent."""
+        await self._idle.wait()
+
+    async def async_submit(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        key: Optional[Hashable] = None,
+    ) -> Any:
+        """Queue a command and wait for its result.
+
+        :param key: Setting the command writes, commands without a key are
+            never coalesced.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if key is None:
+            key = object()
+
+        waiters = [future]
+        previous = self._pending.pop(key, None)
+        if previous is not None:
+            _LOGGER.debug("Coalescing queued command %s", key)
+            waiters = previous.waiters + waiters
+
+        self._pending[key] = _QueuedCommand(func, args, waiters)
+        self._idle.clear()
+
+        if self._worker is None or self._worker.done():
+            self._worker = self._hass.async_create_task(self._async_run())
+
+        return await future
+
+    async def _async_run(self) -> None:
+        while self._pending:
+            _, command = self._pending.popitem(last=False)
+            try:
+                result = await command.func(*command.args)
+            except Exception as exc:  # pylint: disable=broad-except
+                for waiter in command.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+            else:
+                for waiter in command.waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+
+        self._idle.set()
+        self._hass.async_create_task(self._on_drained())
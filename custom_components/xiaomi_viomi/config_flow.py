@@ -1,6 +1,6 @@
 """Config flow to configure Xiaomi Viomi."""
 import logging
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import voluptuous as vol
 from construct.core import ChecksumError
@@ -20,28 +20,50 @@ from homeassistant.exceptions import ConfigEntryAuthFailed, HomeAssistantError
 from homeassistant.helpers.device_registry import format_mac
 from miio import DeviceException
 from miio.device import DeviceInfo
-from miio.integrations.vacuum.viomi.viomivacuum import ViomiVacuum
 
-from .const import DOMAIN
+from .const import CONF_MAX_PROPERTIES, DOMAIN
+from .device import PatchedViomiVacuum
+from .discovery import DiscoveredDevice, async_get_discovery, parse_announced_name
+from .info_cache import async_get_device_info_cache
+from .session import async_get_session_cache
+
+if TYPE_CHECKING:
+    from homeassistant.components.dhcp import DhcpServiceInfo
+    from homeassistant.components.zeroconf import ZeroconfServiceInfo
 
 _LOGGER = logging.getLogger(__name__)
 
-DEVICE_CONFIG = vol.Schema(
-    {
-        vol.Required(CONF_HOST): str,
-        vol.Required(CONF_TOKEN): vol.All(str, vol.Length(min=32, max=32)),
-        vol.Optional(CONF_NAME, default=DEVICE_DEFAULT_NAME): str,
-    }
-)
+CONF_DEVICE = "device"
+# Checkbox of the discovery step to enter the host instead
+CONF_MANUAL = "manual"
+
+
+def _device_schema(host: Optional[str] = None) -> vol.Schema:
+    """Return the device form, suggesting a discovered host."""
+    return vol.Schema(
+        {
+            vol.Required(CONF_HOST, description={"suggested_value": host}): str,
+            vol.Required(CONF_TOKEN): vol.All(str, vol.Length(min=32, max=32)),
+            vol.Optional(CONF_NAME, default=DEVICE_DEFAULT_NAME): str,
+        }
+    )
+
+
+DEVICE_CONFIG = _device_schema()
 
 
 class ViomiDeviceHub:
     """Class to async connect to a Viomi Device."""
 
-    def __init__(self, hass: HomeAssistant):
-        """Initialize the entity."""
+    def __init__(self, hass: HomeAssistant, use_cache: bool = False):
+        """Initialize the entity.
+
+        With `use_cache` a cached device info is trusted and refreshed in the
+        background, instead of asking the device before going on.
+        """
         self._hass = hass
-        self._device: Optional[ViomiVacuum] = None
+        self._use_cache = use_cache
+        self._device: Optional[PatchedViomiVacuum] = None
         self._device_info: Optional[DeviceInfo] = None
 
     @property
@@ -54,19 +76,39 @@ class ViomiDeviceHub:
         """Return the class containing device info."""
         return self._device_info
 
+    def close(self) -> None:
+        """Release the device, unless it was handed over."""
+        if self._device is not None:
+            self._device.close()
+
     async def async_device_is_connectable(self, host: str, token: str) -> bool:
-        """Connect to the Xiaomi Device."""
+        """Connect to the Xiaomi Device.
+
+        The device stays open, so it can be handed over to the coordinator;
+        call `close` if it isn't.
+        """
         _LOGGER.debug("Initializing with host %s (token %s...)", host, token[:5])
 
+        self._device = PatchedViomiVacuum(host, token)
+        sessions = await async_get_session_cache(self._hass)
+        sessions.attach(self._device)
+        infos = await async_get_device_info_cache(self._hass)
+
+        if self._use_cache:
+            self._device_info = infos.get(host, token)
+            if self._device_info is not None:
+                _LOGGER.debug("%s known from cache", self._device_info.model)
+                infos.async_refresh(self._device)
+                return True
+
         try:
-            self._device = ViomiVacuum(host, token)
-            self._device_info = await self._hass.async_add_executor_job(
-                self._device.info
-            )
+            self._device_info = await self._device.info()
 
             if self._device_info:
                 _LOGGER.debug("%s detected", self._device_info.model)
+                infos.async_set(host, token, self._device_info)
         except DeviceException as error:
+            self._device.close()
             if isinstance(error.__cause__, ChecksumError):
                 raise ConfigEntryAuthFailed(error) from error
 
@@ -79,17 +121,33 @@ class ViomiDeviceHub:
         return True
 
 
-async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str, Any]:
-    hub = ViomiDeviceHub(hass)
-
-    if not await hub.async_device_is_connectable(data[CONF_HOST], data[CONF_TOKEN]):
-        raise InvalidAuth
-
-    DEVICE_CONFIG.extend({vol.Optional(CONF_PLATFORM): str})(data)
+async def validate_input(
+    hass: HomeAssistant,
+    data: Dict[str, Any],
+    hub: Optional[ViomiDeviceHub] = None,
+) -> Dict[str, Any]:
+    """Validate the device config, the device is closed unless a hub is given."""
+    own_hub = hub is None
+    if hub is None:
+        hub = ViomiDeviceHub(hass)
+
+    try:
+        if not await hub.async_device_is_connectable(data[CONF_HOST], data[CONF_TOKEN]):
+            raise InvalidAuth
+    finally:
+        if own_hub:
+            hub.close()
+
+    DEVICE_CONFIG.extend(
+        {
+            vol.Optional(CONF_PLATFORM): str,
+            vol.Optional(CONF_MAX_PROPERTIES): vol.All(int, vol.Range(min=1)),
+        }
+    )(data)
 
     name = data[CONF_NAME] if CONF_NAME in data else hub.device_info.model
 
-    return {
+    result = {
         CONF_HOST: data[CONF_HOST],
         CONF_TOKEN: data[CONF_TOKEN],
         CONF_MODEL: hub.device_info.model,
@@ -97,18 +155,32 @@ async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str,
         CONF_MAC: format_mac(hub.device_info.mac_address),
     }
 
+    if CONF_MAX_PROPERTIES in data:
+        result[CONF_MAX_PROPERTIES] = data[CONF_MAX_PROPERTIES]
+
+    return result
+
 
 class XiaomiViomiFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignore
     """Handle a Xiaomi Viomi config flow."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        self._host: Optional[str] = None
+        self._discovered: Optional[Dict[str, DiscoveredDevice]] = None
+
     async def async_step_user(
         self, user_input: Optional[Dict[str, Any]] = None
     ) -> FlowResult:
         """Handle the initial step."""
         if user_input is None:
-            return self.async_show_form(step_id="user", data_schema=DEVICE_CONFIG)
+            if self._discovered is None and self._host is None:
+                return await self.async_step_pick_device()
+            return self.async_show_form(
+                step_id="user", data_schema=_device_schema(self._host)
+            )
 
         errors = {}
         try:
@@ -133,16 +205,94 @@ class XiaomiViomiFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):  # type:
                 data[CONF_NAME] = info[CONF_NAME] or existing_entry.title
                 data[CONF_MODEL] = info[CONF_MODEL]
 
+                # A new address is taken over live, a new token needs a reload
+                token_changed = existing_entry.data.get(CONF_TOKEN) != data[CONF_TOKEN]
                 self.hass.config_entries.async_update_entry(existing_entry, data=data)
-                await self.hass.config_entries.async_reload(existing_entry.entry_id)
+                if token_changed:
+                    await self.hass.config_entries.async_reload(existing_entry.entry_id)
                 return self.async_abort(reason="already_configured")
 
             return self.async_create_entry(title=info[CONF_NAME], data=info)
 
         return self.async_show_form(
-            step_id="user", data_schema=DEVICE_CONFIG, errors=errors
+            step_id="user", data_schema=_device_schema(self._host), errors=errors
         )
 
+    async def async_step_pick_device(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """Scan the network and let the user pick one of the found vacuums."""
+        if user_input is not None:
+            self._host = None if user_input[CONF_MANUAL] else user_input[CONF_DEVICE]
+            return await self.async_step_user()
+
+        configured = {
+            entry.data.get(CONF_HOST) for entry in self._async_current_entries()
+        } | self._async_current_ids()
+        devices = await async_get_discovery(self.hass).async_scan()
+        self._discovered = {
+            device.host: device
+            for device in devices
+            if device.host not in configured and device.mac not in configured
+        }
+        if not self._discovered:
+            return await self.async_step_user()
+
+        choices = {host: device.label for host, device in self._discovered.items()}
+        first = next(iter(choices))
+        return self.async_show_form(
+            step_id="pick_device",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_DEVICE, default=first): vol.In(choices),
+                    vol.Optional(CONF_MANUAL, default=False): bool,
+                }
+            ),
+        )
+
+    async def async_step_zeroconf(
+        self, discovery_info: "ZeroconfServiceInfo"
+    ) -> FlowResult:
+        """Handle a vacuum announced over zeroconf."""
+        model, device_id = parse_announced_name(discovery_info.name)
+        mac = discovery_info.properties.get("mac")
+        return await self._async_step_announced(
+            DiscoveredDevice(
+                discovery_info.host,
+                device_id,
+                model,
+                format_mac(mac) if mac else None,
+            )
+        )
+
+    async def async_step_dhcp(self, discovery_info: "DhcpServiceInfo") -> FlowResult:
+        """Handle a vacuum which got an address over DHCP."""
+        model, device_id = parse_announced_name(discovery_info.hostname)
+        return await self._async_step_announced(
+            DiscoveredDevice(
+                discovery_info.ip,
+                device_id,
+                model,
+                format_mac(discovery_info.macaddress),
+            )
+        )
+
+    async def _async_step_announced(self, device: DiscoveredDevice) -> FlowResult:
+        async_get_discovery(self.hass).async_announce(device)
+        if not device.is_viomi:
+            return self.async_abort(reason="not_viomi_device")
+
+        if device.mac is not None:
+            await self.async_set_unique_id(device.mac)
+            self._abort_if_unique_id_configured(
+                {CONF_HOST: device.host}, reload_on_update=False
+            )
+        self._async_abort_entries_match({CONF_HOST: device.host})
+
+        self._host = device.host
+        self.context["title_placeholders"] = {"name": device.label}
+        return await self.async_step_user()
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
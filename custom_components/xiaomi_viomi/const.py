@@ -1,4 +1,5 @@
 """Constants for Xiaomi Viomi integration."""
+from datetime import timedelta
 
 from homeassistant.components.vacuum import (
     STATE_CLEANING,
@@ -18,31 +19,84 @@ from homeassistant.components.vacuum import (
 
 DOMAIN = "xiaomi_viomi"
 CONF_FLOW_TYPE = "config_flow_device"
+CONF_MAX_PROPERTIES = "max_properties"
+CONF_MAX_CONCURRENT_POLLS = "max_concurrent_polls"
 
-DEVICE_PROPERTIES = [
+DATA_SESSIONS = f"{DOMAIN}_sessions"
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+DATA_CAPABILITIES = f"{DOMAIN}_capabilities"
+DATA_DEVICE_INFO = f"{DOMAIN}_device_info"
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
+STORAGE_VERSION = 1
+# Delay in seconds to group session cache writes
+SESSION_SAVE_DELAY = 30
+
+# How many properties are requested in a single get_prop call. Firmware that
+# rejects multi-property requests makes the device fall back to smaller chunks.
+DEFAULT_MAX_PROPERTIES = 16
+
+# miIO request timeout in seconds and retries before the device is unreachable
+DEFAULT_TIMEOUT = 5
+DEFAULT_RETRY_COUNT = 3
+# Requests sent to a device back to back without waiting for the answers
+DEFAULT_MAX_IN_FLIGHT = 4
+# Devices polled at the same time, polls of further devices wait for a slot
+DEFAULT_MAX_CONCURRENT_POLLS = 4
+# Seconds discovery waits for answers, and hosts probed at the same time
+DISCOVERY_TIMEOUT = 3
+MAX_CONCURRENT_PROBES = 16
+
+# Failed polls in a row before a device is considered unreachable. It is then
+# only probed, with a backoff doubling from BACKOFF_MIN up to BACKOFF_MAX.
+BREAKER_FAILURE_THRESHOLD = 3
+BACKOFF_MIN = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(minutes=10)
+
+UPDATE_INTERVAL = timedelta(seconds=20)
+UPDATE_INTERVAL_ACTIVE = timedelta(seconds=5)
+UPDATE_INTERVAL_IDLE = timedelta(seconds=60)
+SLOW_UPDATE_INTERVAL = timedelta(minutes=10)
+# Polls are only a consistency check while the device pushes its state. It
+# is polled as usual again when nothing was pushed for PUSH_STALE_AFTER.
+PUSH_UPDATE_INTERVAL = timedelta(minutes=5)
+PUSH_STALE_AFTER = timedelta(minutes=10)
+# Full polls in a row a property has to be null in before fast polls leave
+# it out. Full polls request every property, so it comes back once answered.
+PRUNE_AFTER_PROBES = 3
+# How long the device is polled with UPDATE_INTERVAL_ACTIVE after a command
+COMMAND_FAST_POLLING_DURATION = timedelta(minutes=1)
+
+# Volatile properties, requested on every poll
+DEVICE_PROPERTIES_FAST = [
     "battary_life",
-    "box_type",
-    "cur_mapid",
     "err_state",
-    "has_map",
     "has_newmap",
-    "hw_info",
     "is_charge",
     "is_mop",
     "is_work",
-    "light_state",
-    "map_num",
     "mode",
-    "mop_route",
     "mop_type",
-    "remember_map",
-    "repeat_state",
     "run_state",
     "s_area",
     "s_time",
     "suction_grade",
-    "v_state",
     "water_grade",
+]
+
+# Settings, firmware info, map metadata and consumables, which rarely change
+# and are requested once per SLOW_UPDATE_INTERVAL together with consumables
+# and DND configuration
+DEVICE_PROPERTIES_SLOW = [
+    "box_type",
+    "cur_mapid",
+    "has_map",
+    "hw_info",
+    "light_state",
+    "map_num",
+    "mop_route",
+    "remember_map",
+    "repeat_state",
+    "v_state",
     "order_time",
     "start_time",
     "water_percent",
@@ -58,6 +112,8 @@ DEVICE_PROPERTIES = [
     "hypa_life",
 ]
 
+DEVICE_PROPERTIES = DEVICE_PROPERTIES_FAST + DEVICE_PROPERTIES_SLOW
+
 ATTR_CLEANING_TIME = "cleaning_time"
 ATTR_DO_NOT_DISTURB = "do_not_disturb"
 ATTR_DO_NOT_DISTURB_START = "do_not_disturb_start"
@@ -69,6 +125,15 @@ ATTR_MOP_LEFT = "mop_left"
 ATTR_ERROR = "error"
 ATTR_STATUS = "status"
 ATTR_MOP_ATTACHED = "mop_attached"
+ATTR_WATER_GRADE = "water_grade"
+ATTR_SEGMENTS = "segments"
+ATTR_ZONE = "zone"
+ATTR_X_COORD = "x_coord"
+ATTR_Y_COORD = "y_coord"
+
+SERVICE_CLEAN_SEGMENT = "clean_segment"
+SERVICE_CLEAN_ZONE = "clean_zone"
+SERVICE_GOTO = "goto"
 
 ERRORS_FALSE_POSITIVE = (
     0,  # Sleeping and not charging,
@@ -99,3 +164,10 @@ STATE_CODE_TO_STATE = {
     5: STATE_DOCKED,  # Docked
     6: STATE_CLEANING,  # VacuumingAndMopping
 }
+
+STATE_UPDATE_INTERVAL = {
+    STATE_CLEANING: UPDATE_INTERVAL_ACTIVE,
+    STATE_RETURNING: UPDATE_INTERVAL_ACTIVE,
+    STATE_DOCKED: UPDATE_INTERVAL_IDLE,
+    STATE_IDLE: UPDATE_INTERVAL_IDLE,
+}
@@ -0,0 +1,384 @@
+"""Data update coordinator for Xiaomi Viomi integration."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from homeassistant.components.xiaomi_miio import CONF_MODEL
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_MAC
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from miio import DeviceException
+from miio.integrations.vacuum.roborock.vacuumcontainers import DNDStatus
+from miio.integrations.vacuum.viomi.viomivacuum import ViomiConsumableStatus
+
+from .breaker import ViomiCircuitBreaker
+from .capabilities import (
+    FIRMWARE_PROPERTY,
+    ViomiCapabilityStore,
+    null_probes,
+    prune,
+    pruned_probes,
+    supported_properties,
+)
+from .command_queue import ViomiCommandQueue
+from .const import (
+    COMMAND_FAST_POLLING_DURATION,
+    DEVICE_PROPERTIES,
+    DEVICE_PROPERTIES_FAST,
+    DEVICE_PROPERTIES_SLOW,
+    PUSH_UPDATE_INTERVAL,
+    SLOW_UPDATE_INTERVAL,
+    STATE_UPDATE_INTERVAL,
+    UPDATE_INTERVAL,
+    UPDATE_INTERVAL_ACTIVE,
+)
+from .device import PatchedViomiVacuum
+from .discovery import async_get_discovery
+from .push import ViomiPushListener
+from .scheduler import async_get_scheduler
+from .status import ViomiStatusSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ViomiCoordinatorData:
+    """Snapshot of the device state shared by all entities."""
+
+    status: ViomiStatusSnapshot
+    consumables: ViomiConsumableStatus
+    dnd: DNDStatus
+
+
+class ViomiDataUpdateCoordinator(DataUpdateCoordinator[ViomiCoordinatorData]):
+    """Poll a single Viomi device once per cycle for all of its entities.
+
+    Volatile properties are requested on every poll, while the slow tier
+    (settings, map metadata, consumables and DND) is refreshed once per
+    SLOW_UPDATE_INTERVAL and served from the previous snapshot in between.
+
+    The update interval follows the run state of the robot: it is short while
+    cleaning or returning, long while docked or idle, and short again for a
+    while after any command.
+
+    Scheduled polls are placed by the domain scheduler, which spreads the
+    devices over the interval and bounds how many are polled at once.
+
+    A device failing several polls in a row is only probed with a single
+    hello, with an increasing backoff, until it answers again. It is also
+    looked for at other addresses by its device id and MAC, and followed
+    there without reloading the entry.
+
+    Properties notified by the device are applied right away, and polls are
+    rare while notifications keep coming.
+
+    Properties the model and firmware never answer are left out of the fast
+    polls once several full polls have shown which ones they are. Full polls
+    still request them, so they come back when the device answers them.
+    """
+
+    # Declared again, mypy can't tell the type of base class attributes
+    # which are also assigned here
+    _unsub_refresh: Optional[CALLBACK_TYPE]
+    data: ViomiCoordinatorData
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        device: PatchedViomiVacuum,
+        entry: ConfigEntry,
+        capabilities: Optional[ViomiCapabilityStore] = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass, _LOGGER, name=entry.title, update_interval=UPDATE_INTERVAL
+        )
+        self.device = device
+        self.entry = entry
+
+        # Properties the device answers, None until they are probed. The
+        # firmware is remembered by MAC, YAML setups get a new entry id with
+        # every start.
+        self.capabilities = capabilities
+        self._capability_device = entry.data.get(CONF_MAC) or entry.entry_id
+        self._firmware: Any = None
+        self.supported: Optional[FrozenSet[str]] = None
+        if capabilities is not None:
+            self._firmware = capabilities.firmware(self._capability_device)
+            self.supported = capabilities.get(
+                entry.data.get(CONF_MODEL), self._firmware
+            )
+        # Full polls in a row each property was null in
+        self._null_probes = pruned_probes(self.supported)
+
+        self._slow_properties: Dict[str, Any] = {}
+        self._slow_updated_at: Optional[float] = None
+        self._fast_polling_until = 0.0
+
+        # Room names by id, fetched once per map
+        self._rooms: Optional[Dict[str, str]] = None
+        self._rooms_map: Optional[Tuple] = None
+
+        # Monotonic time the last poll started talking to the device
+        self.fetch_started_at = 0.0
+
+        # Commands are sent ahead of polls, a burst is followed by one refresh
+        self.commands = ViomiCommandQueue(hass, self.async_request_fast_polling)
+
+        self.breaker = ViomiCircuitBreaker()
+        # Filled by the transport, poll durations are added here
+        self.metrics = device.transport.metrics
+
+        self.push = ViomiPushListener(self)
+        self.push.async_start()
+
+        self.scheduler = async_get_scheduler(hass)
+        self.scheduler.async_register(entry.entry_id)
+
+    @callback
+    def async_shutdown_scheduling(self) -> None:
+        """Stop polling and give up the slot in the schedule."""
+        self.scheduler.async_unregister(self.entry.entry_id)
+        self.push.async_stop()
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule the next poll at the phase of this device."""
+        if self.update_interval is None:
+            return
+
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+
+        self._unsub_refresh = async_track_point_in_utc_time(
+            self.hass,
+            self._job,
+            self.scheduler.next_poll(self.entry.entry_id, self.update_interval),
+        )
+
+    async def async_request_fast_polling(self) -> None:
+        """Poll fast for a while, e.g. after a command, and request a refresh."""
+        self._fast_polling_until = (
+            time.monotonic() + COMMAND_FAST_POLLING_DURATION.total_seconds()
+        )
+        self.update_interval = UPDATE_INTERVAL_ACTIVE
+
+        await self.async_request_refresh()
+
+    def _update_interval_for(self, data: ViomiCoordinatorData) -> timedelta:
+        if time.monotonic() < self._fast_polling_until:
+            return UPDATE_INTERVAL_ACTIVE
+
+        if self.push.is_alive:
+            return PUSH_UPDATE_INTERVAL
+
+        state = data.status.activity
+        if state is None:
+            return UPDATE_INTERVAL
+        return STATE_UPDATE_INTERVAL.get(state, UPDATE_INTERVAL)
+
+    async def _async_probe(self) -> bool:
+        try:
+            return await self.device.probe()
+        except (OSError, DeviceException, asyncio.TimeoutError) as exc:
+            _LOGGER.debug("Unable to probe %s: %s", self.name, exc)
+            return False
+
+    @callback
+    def async_set_host(self, host: str) -> None:
+        """Talk to the device at a new address, without reloading the entry."""
+        if host == self.device.ip:
+            return
+
+        _LOGGER.info("%s moved from %s to %s", self.name, self.device.ip, host)
+        self.device.set_host(host)
+
+    async def _async_rediscover(self) -> bool:
+        """Look for the device at another address, e.g. after DHCP moved it."""
+        host = await async_get_discovery(self.hass).async_find(
+            self.device.transport.device_id, self.entry.data.get(CONF_MAC)
+        )
+        if host is None or host == self.device.ip:
+            return False
+
+        self.async_set_host(host)
+        # Entries of YAML setups aren't registered, those only move live
+        if self.hass.config_entries.async_get_entry(self.entry.entry_id):
+            self.hass.config_entries.async_update_entry(
+                self.entry, data={**self.entry.data, CONF_HOST: host}
+            )
+        return True
+
+    async def async_get_rooms(self) -> Dict[str, str]:
+        """Return room names by id of the current map.
+
+        The list is cached until the device switches to another map or
+        reports a new one.
+        """
+        status = self.data.status if self.data else None
+        rooms_map = (status.current_map_id, status.has_new_map) if status else None
+        if self._rooms is None or rooms_map != self._rooms_map:
+            self._rooms = await self.device.get_rooms()
+            self._rooms_map = rooms_map
+            _LOGGER.debug("Rooms of map %s: %s", rooms_map, self._rooms)
+
+        return self._rooms
+
+    @callback
+    def async_push_properties(self, properties: Dict[str, Any]) -> None:
+        """Apply properties pushed by the device without waiting for a poll.
+
+        The poll schedule is left alone, so pushes can't postpone the
+        consistency checks.
+        """
+        if self.data is None:
+            return
+
+        status = ViomiStatusSnapshot({**self.data.status.data, **properties})
+        for key in DEVICE_PROPERTIES_SLOW:
+            if key in properties:
+                self._slow_properties[key] = properties[key]
+        if status == self.data.status:
+            return
+
+        # Pushed state is as fresh as a poll started now
+        self.fetch_started_at = time.monotonic()
+        self.data = ViomiCoordinatorData(
+            status=status, consumables=self.data.consumables, dnd=self.data.dnd
+        )
+        for update_callback in self._listeners:
+            update_callback()
+
+    def _update_capabilities(self, properties: Dict[str, Any]) -> None:
+        """Update the supported properties with the result of a full poll."""
+        if self.capabilities is None:
+            return
+
+        model = self.entry.data.get(CONF_MODEL)
+        firmware = properties.get(FIRMWARE_PROPERTY)
+        if firmware != self._firmware:
+            if self._firmware is not None:
+                _LOGGER.info(
+                    "Firmware of %s changed to %s, probing its properties again",
+                    self.name,
+                    firmware,
+                )
+            self._firmware = firmware
+            self._null_probes = pruned_probes(self.capabilities.get(model, firmware))
+
+        self._null_probes = null_probes(self._null_probes, properties)
+        self.supported = supported_properties(self._null_probes)
+        self.capabilities.async_set(
+            self._capability_device, model, firmware, self.supported
+        )
+
+    def invalidate_slow_tier(self) -> None:
+        """Request the slow tier with the next poll."""
+        self._slow_updated_at = None
+
+    def _slow_tier_expired(self) -> bool:
+        return (
+            self.data is None
+            or self._slow_updated_at is None
+            or time.monotonic() - self._slow_updated_at
+            >= SLOW_UPDATE_INTERVAL.total_seconds()
+        )
+
+    async def _async_fetch_data(self) -> ViomiCoordinatorData:
+        self.fetch_started_at = time.monotonic()
+
+        if not self._slow_tier_expired():
+            requested = prune(DEVICE_PROPERTIES_FAST, self.supported)
+            values = await self.device.get_properties_batched(requested)
+            properties = dict(zip(requested, values))
+
+            return ViomiCoordinatorData(
+                status=ViomiStatusSnapshot({**self._slow_properties, **properties}),
+                consumables=self.data.consumables,
+                dnd=self.data.dnd,
+            )
+
+        # Pipelined by the transport, so this takes about one round-trip. All
+        # properties are requested, pruned ones may be answered again.
+        values, consumables, dnd = await asyncio.gather(
+            self.device.get_properties_batched(DEVICE_PROPERTIES),
+            self.device.consumable_status(),
+            self.device.dnd_status(),
+        )
+        properties = dict(zip(DEVICE_PROPERTIES, values))
+        data = ViomiCoordinatorData(
+            status=ViomiStatusSnapshot(properties),
+            consumables=consumables,
+            dnd=dnd,
+        )
+
+        self._slow_properties = {key: properties[key] for key in DEVICE_PROPERTIES_SLOW}
+        self._slow_updated_at = time.monotonic()
+        self._update_capabilities(properties)
+
+        return data
+
+    async def _async_update_data(self) -> ViomiCoordinatorData:
+        """Fetch state from the device."""
+        # Don't hold a poll slot while commands are still being sent
+        await self.commands.async_wait_idle()
+
+        if (
+            self.breaker.is_open
+            and not await self._async_probe()
+            and not (await self._async_rediscover() and await self._async_probe())
+        ):
+            self.breaker.record_failure()
+            self.update_interval = self.breaker.backoff()
+            raise UpdateFailed(
+                f"Device is unreachable, probing again in {self.update_interval}"
+            )
+
+        started = None
+        try:
+            async with self.scheduler.async_poll(self.entry.entry_id):
+                started = time.monotonic()
+                data = await self._async_fetch_data()
+        except (OSError, DeviceException) as exc:
+            if started is not None:
+                self.metrics.record_poll(time.monotonic() - started, success=False)
+            moved = False
+            if self.breaker.record_failure():
+                _LOGGER.warning(
+                    "%s failed %s polls in a row, backing off",
+                    self.name,
+                    self.breaker.failures,
+                )
+                moved = await self._async_rediscover()
+            if moved:
+                # Check the new address right away instead of backing off
+                self.update_interval = UPDATE_INTERVAL_ACTIVE
+            elif self.breaker.is_open:
+                self.update_interval = self.breaker.backoff()
+            raise UpdateFailed(
+                f"Got exception while fetching the state: {exc}"
+            ) from exc
+
+        self.metrics.record_poll(time.monotonic() - started, success=True)
+        if self.breaker.record_success():
+            _LOGGER.info("%s is reachable again", self.name)
+
+        self.update_interval = self._update_interval_for(data)
+
+        # Keep the previous snapshot if nothing changed, so entities can
+        # tell by identity that there is nothing to recompute
+        if data == self.data:
+            return self.data
+        return data
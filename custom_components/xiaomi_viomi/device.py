@@ -0,0 +1,209 @@
+"""Xiaomi Viomi device."""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from miio import DeviceError
+from miio.device import DeviceInfo
+from miio.integrations.vacuum.roborock.vacuumcontainers import DNDStatus
+from miio.integrations.vacuum.viomi.viomivacuum import (
+    ViomiConsumableStatus,
+    _get_rooms_from_schedules,
+)
+
+from .const import (
+    DEFAULT_MAX_PROPERTIES,
+    DEFAULT_RETRY_COUNT,
+    DEFAULT_TIMEOUT,
+    DEVICE_PROPERTIES,
+)
+from .status import ViomiStatusSnapshot
+from .transport import MiioTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PatchedViomiVacuum:
+    """Viomi vacuum commands on top of the asyncio miIO transport.
+
+    This follows miio's ViomiVacuum, but every request is awaited on the
+    event loop instead of blocking an executor thread.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        token: str,
+        *,
+        max_properties: int = DEFAULT_MAX_PROPERTIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        retry_count: int = DEFAULT_RETRY_COUNT,
+    ) -> None:
+        """Initialize the device with the preferred get_prop chunk size."""
+        self.ip = ip
+        self.token = token
+        self.max_properties = max(1, max_properties)
+        self.transport = MiioTransport(
+            ip, token, timeout=timeout, retry_count=retry_count
+        )
+        self._edge_state: Optional[List[Any]] = None
+
+    def close(self) -> None:
+        """Release the network endpoint of the device."""
+        self.transport.close()
+
+    def set_host(self, host: str) -> None:
+        """Switch to a new address of the device."""
+        self.ip = host
+        self.transport.set_host(host)
+
+    async def send(self, command: str, parameters: Any = None) -> Any:
+        """Send a command to the device."""
+        return await self.transport.async_send(command, parameters)
+
+    async def probe(self) -> bool:
+        """Check with a single hello whether the device is reachable."""
+        return await self.transport.async_probe()
+
+    async def raw_command(self, command: str, parameters: Any) -> Any:
+        """Send a raw command to the device."""
+        return await self.send(command, parameters)
+
+    async def info(self) -> DeviceInfo:
+        """Get miIO protocol information from the device."""
+        return DeviceInfo(await self.send("miIO.info"))
+
+    async def _async_get_chunk(self, chunk: List[str]) -> Optional[List[Any]]:
+        """Request a chunk of properties, None if the device rejected it."""
+        try:
+            result = await self.send("get_prop", chunk)
+        except DeviceError:
+            if len(chunk) == 1:
+                raise
+            return None
+
+        if len(chunk) == 1:
+            return [result[0] if result else None]
+        if result is not None and len(result) == len(chunk):
+            return result
+        return None
+
+    async def get_properties_batched(self, properties: List[str]) -> List[Any]:
+        """Request properties in chunks of `max_properties`.
+
+        All chunks are sent at once and pipelined by the transport. When the
+        firmware rejects a chunk, or answers with a different amount of
+        values, the chunk size is halved and the rejected properties are
+        requested again. The chunk size that worked is kept for the
+        following polls.
+        """
+        values: Dict[str, Any] = {}
+        remaining = list(properties)
+        while remaining:
+            size = self.max_properties
+            chunks = [remaining[i : i + size] for i in range(0, len(remaining), size)]
+            results = await asyncio.gather(*map(self._async_get_chunk, chunks))
+
+            remaining = []
+            for chunk, result in zip(chunks, results):
+                if result is None:
+                    remaining.extend(chunk)
+                else:
+                    values.update(zip(chunk, result))
+
+            if remaining:
+                self.max_properties = max(1, size // 2)
+                _LOGGER.debug(
+                    "Device rejected %s properties at once, falling back to %s",
+                    size,
+                    self.max_properties,
+                )
+
+        return [values[prop] for prop in properties]
+
+    async def status(self) -> ViomiStatusSnapshot:
+        """Override of miio's device.status() because of bug."""
+        values = await self.get_properties_batched(DEVICE_PROPERTIES)
+
+        return ViomiStatusSnapshot(dict(zip(DEVICE_PROPERTIES, values)))
+
+    async def consumable_status(self) -> ViomiConsumableStatus:
+        """Return information about consumables."""
+        return ViomiConsumableStatus(await self.send("get_consumables"))
+
+    async def dnd_status(self) -> DNDStatus:
+        """Return do-not-disturb status."""
+        status = await self.send("get_notdisturb")
+        return DNDStatus(
+            dict(
+                enabled=status[0],
+                start_hour=status[1],
+                start_minute=status[2],
+                end_hour=status[3],
+                end_minute=status[4],
+            )
+        )
+
+    async def _async_edge_state(self, refresh: bool = False) -> List[Any]:
+        if refresh or not self._edge_state:
+            self._edge_state = await self.get_properties_batched(["mode"])
+        return self._edge_state
+
+    async def start(self) -> None:
+        """Start cleaning."""
+        edge_state = await self._async_edge_state(refresh=True)
+        await self.send("set_mode_withroom", edge_state + [1, 0])
+
+    async def get_rooms(self) -> Dict[str, str]:
+        """Return room names by room id.
+
+        The rooms are read from inactive 00:00 schedules, see miio's
+        ViomiVacuum.get_rooms for how to set them up in the app.
+        """
+        schedules = await self.send("get_ordertime", [])
+        _, rooms = _get_rooms_from_schedules(schedules or [])
+        return rooms
+
+    async def start_with_rooms(self, room_ids: Sequence[int]) -> None:
+        """Start cleaning specific rooms."""
+        edge_state = await self._async_edge_state(refresh=True)
+        await self.send(
+            "set_mode_withroom", edge_state + [1, len(room_ids)] + list(room_ids)
+        )
+
+    async def clean_zones(
+        self, zones: Sequence[Tuple[float, float, float, float]]
+    ) -> None:
+        """Clean rectangles given as x1, y1, x2, y2 in map coordinates."""
+        corners = [
+            f"{index}_0_4_{x1}_{y1}_{x2}_{y1}_{x2}_{y2}_{x1}_{y2}"
+            for index, (x1, y1, x2, y2) in enumerate(zones)
+        ]
+        await self.send("set_zone", [len(zones), *corners])
+        await self.send("set_mode", [3, 1])
+
+    async def goto(self, x: float, y: float) -> None:
+        """Send the vacuum to a point in map coordinates."""
+        await self.send("set_pointclean", [1, x, y])
+
+    async def pause(self) -> None:
+        """Pause cleaning."""
+        edge_state = await self._async_edge_state()
+        await self.send("set_mode", edge_state + [2])
+
+    async def stop(self) -> None:
+        """Stop cleaning."""
+        edge_state = await self._async_edge_state()
+        await self.send("set_mode", edge_state + [0])
+
+    async def home(self) -> None:
+        """Return to home."""
+        await self.send("set_charge", [1])
+
+    async def locate(self) -> None:
+        """Locate a device."""
+        await self.send("set_resetpos", [1])
+
+    async def set_fan_speed(self, speed: int) -> None:
+        """Set fanspeed, see ViomiModelProfile for the steps."""
+        await self.send("set_suction", [speed])
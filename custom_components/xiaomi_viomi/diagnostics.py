@@ -0,0 +1,53 @@
+"""Diagnostics of Xiaomi Viomi integration."""
+from typing import Any, Dict, Mapping
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_TOKEN
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import ViomiDataUpdateCoordinator
+
+REDACTED = "**REDACTED**"
+TO_REDACT = {CONF_TOKEN}
+
+
+def _redact(data: Mapping[str, Any]) -> Dict[str, Any]:
+    return {key: REDACTED if key in TO_REDACT else value for key, value in data.items()}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return the state of the polling and transport of a config entry."""
+    coordinator: ViomiDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    cost = coordinator.scheduler.costs.get(entry.entry_id)
+    push = coordinator.push
+
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": _redact(entry.data),
+            "options": _redact(entry.options),
+        },
+        "update_interval": coordinator.update_interval.total_seconds(),
+        "last_update_success": coordinator.last_update_success,
+        "metrics": coordinator.metrics.as_dict(),
+        "poll_cost": {
+            "polls": cost.polls,
+            "total": cost.total,
+            "last": cost.last,
+        }
+        if cost
+        else None,
+        "circuit_breaker": {
+            "open": coordinator.breaker.is_open,
+            "failures": coordinator.breaker.failures,
+        },
+        "push": {"alive": push.is_alive, "pushes": push.pushes},
+        "max_properties": coordinator.device.max_properties,
+        "supported_properties": sorted(coordinator.supported)
+        if coordinator.supported is not None
+        else None,
+        "status": coordinator.data.status.data if coordinator.data else None,
+    }
@@ -0,0 +1,233 @@
+"""LAN discovery of Viomi vacuums for Xiaomi Viomi integration."""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, cast
+
+from construct.core import ConstructError
+from homeassistant.core import HomeAssistant, callback
+from miio import DeviceException
+from miio.protocol import Message
+
+from .const import DATA_DISCOVERY, DISCOVERY_TIMEOUT, MAX_CONCURRENT_PROBES
+from .transport import HELLO_BYTES, MIIO_PORT, MiioTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+BROADCAST_ADDRESS = "255.255.255.255"
+VIOMI_MODEL_PREFIX = "viomi.vacuum."
+# Hellos are answered without a valid token
+NO_TOKEN = "0" * 32
+
+# Zeroconf service names and DHCP hostnames look like viomi-vacuum-v8_miio123,
+# with the device id, or like viomi-vacuum-v8_miap1a2b with part of the MAC
+_ANNOUNCED_NAME = re.compile(r"^(?P<model>[a-z0-9-]+?)_mi(?:io(?P<did>\d+)|ap)")
+
+
+@dataclass
+class DiscoveredDevice:
+    """A miIO device found on the network."""
+
+    host: str
+    device_id: Optional[int] = None
+    model: Optional[str] = None
+    mac: Optional[str] = None
+
+    @property
+    def is_viomi(self) -> bool:
+        """Return whether this may be a Viomi vacuum, unknown models may be."""
+        return self.model is None or self.model.startswith(VIOMI_MODEL_PREFIX)
+
+    @property
+    def label(self) -> str:
+        """Return how the device is presented in the config flow."""
+        return f"{self.model or 'Unknown miIO device'} ({self.host})"
+
+
+def parse_announced_name(name: str) -> Tuple[Optional[str], Optional[int]]:
+    """Return model and device id from a zeroconf name or DHCP hostname."""
+    match = _ANNOUNCED_NAME.match(name.lower())
+    if match is None:
+        return None, None
+
+    device_id = match.group("did")
+    return (
+        match.group("model").replace("-", "."),
+        int(device_id) if device_id else None,
+    )
+
+
+def parse_hello(data: bytes) -> Optional[int]:
+    """Return the device id of a hello answer, None for other datagrams."""
+    if len(data) != 32:
+        return None
+
+    try:
+        header = Message.parse(data).header.value
+    except ConstructError:
+        return None
+    return int.from_bytes(header.device_id, "big")
+
+
+class _HelloProtocol(asyncio.DatagramProtocol):
+    """Collect the devices answering a hello."""
+
+    def __init__(self) -> None:
+        self.responders: Dict[str, int] = {}
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        device_id = parse_hello(data)
+        if device_id is not None:
+            self.responders[addr[0]] = device_id
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug("Discovery socket error: %s", exc)
+
+
+async def async_broadcast_hello(
+    timeout: float = DISCOVERY_TIMEOUT,
+    address: str = BROADCAST_ADDRESS,
+    port: int = MIIO_PORT,
+) -> Dict[str, int]:
+    """Broadcast a hello and return the device id of every responder by host."""
+    loop = asyncio.get_running_loop()
+    protocol = _HelloProtocol()
+    try:
+        endpoint, _ = await loop.create_datagram_endpoint(
+            lambda: protocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+        )
+    except OSError as ex:
+        _LOGGER.warning("Unable to broadcast a miIO hello: %s", ex)
+        return {}
+    transport = cast(asyncio.DatagramTransport, endpoint)
+
+    try:
+        # Datagrams get lost, the hello is repeated halfway
+        for _ in range(2):
+            transport.sendto(HELLO_BYTES, (address, port))
+            await asyncio.sleep(timeout / 2)
+    finally:
+        transport.close()
+
+    _LOGGER.debug("%s devices answered the hello", len(protocol.responders))
+    return protocol.responders
+
+
+async def async_probe_host(
+    host: str, timeout: float = DISCOVERY_TIMEOUT, port: int = MIIO_PORT
+) -> Optional[int]:
+    """Send a single hello to a host, return its device id if it answered."""
+    transport = MiioTransport(host, NO_TOKEN, timeout=timeout)
+    transport.port = port
+    try:
+        if await transport.async_probe():
+            return transport.device_id
+    except DeviceException as ex:
+        _LOGGER.debug("Probing %s failed: %s", host, ex)
+    finally:
+        transport.close()
+
+    return None
+
+
+class ViomiDiscovery:
+    """Find Viomi vacuums with a hello broadcast and zeroconf/DHCP.
+
+    A hello answer carries no model, which is only known for devices
+    announced over zeroconf or DHCP. Announced devices are also probed
+    directly, broadcasts don't reach other subnets. The probes run next to
+    the broadcast, so a scan takes a single timeout.
+    """
+
+    def __init__(self, port: int = MIIO_PORT) -> None:
+        """Initialize discovery without known devices."""
+        self.port = port
+        self._announced: Dict[str, DiscoveredDevice] = {}
+
+    @callback
+    def async_announce(self, device: DiscoveredDevice) -> None:
+        """Remember a device announced over zeroconf or DHCP."""
+        known = self._announced.get(device.host)
+        if known is not None:
+            device.device_id = device.device_id or known.device_id
+            device.model = device.model or known.model
+            device.mac = device.mac or known.mac
+        self._announced[device.host] = device
+
+    async def async_scan(
+        self,
+        timeout: float = DISCOVERY_TIMEOUT,
+        max_concurrent: int = MAX_CONCURRENT_PROBES,
+        address: str = BROADCAST_ADDRESS,
+    ) -> List[DiscoveredDevice]:
+        """Return the Viomi vacuums which answered, sorted by host."""
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def _async_probe(host: str) -> Tuple[str, Optional[int]]:
+            async with semaphore:
+                return host, await async_probe_host(host, timeout, self.port)
+
+        responders, *probed = await asyncio.gather(
+            async_broadcast_hello(timeout, address, self.port),
+            *(_async_probe(host) for host in self._announced),
+        )
+        devices = {
+            host: DiscoveredDevice(host, device_id)
+            for host, device_id in [*responders.items(), *probed]
+            if device_id is not None
+        }
+
+        # Announcements tell the model, matched by device id where known
+        by_id = {
+            device.device_id: device
+            for device in self._announced.values()
+            if device.device_id is not None
+        }
+        for device in devices.values():
+            announced = self._announced.get(device.host)
+            if device.device_id in by_id:
+                announced = by_id[device.device_id]
+            if announced is not None:
+                device.model = announced.model
+                device.mac = announced.mac
+
+        return sorted(
+            (device for device in devices.values() if device.is_viomi),
+            key=lambda device: device.host,
+        )
+
+    async def async_find(
+        self,
+        device_id: Optional[int],
+        mac: Optional[str],
+        timeout: float = DISCOVERY_TIMEOUT,
+        address: str = BROADCAST_ADDRESS,
+    ) -> Optional[str]:
+        """Return the current address of a device, found by device id or MAC.
+
+        Only a known device id can be matched to hello answers, the MAC is
+        matched to zeroconf and DHCP announcements.
+        """
+        if device_id is not None:
+            responders = await async_broadcast_hello(timeout, address, self.port)
+            for host, responder_id in responders.items():
+                if responder_id == device_id:
+                    return host
+
+        for device in self._announced.values():
+            if (device_id is not None and device.device_id == device_id) or (
+                mac is not None and device.mac == mac
+            ):
+                return device.host
+
+        return None
+
+
+@callback
+def async_get_discovery(hass: HomeAssistant) -> ViomiDiscovery:
+    """Return the discovery shared by all config flows."""
+    if DATA_DISCOVERY not in hass.data:
+        hass.data[DATA_DISCOVERY] = ViomiDiscovery()
+
+    return hass.data[DATA_DISCOVERY]
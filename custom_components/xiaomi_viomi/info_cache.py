@@ -0,0 +1,75 @@
+"""Persistent device info cache for Xiaomi Viomi integration."""
+import logging
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from miio import DeviceException
+from miio.device import DeviceInfo
+
+from .const import DATA_DEVICE_INFO, SESSION_SAVE_DELAY, STORAGE_VERSION
+from .device import PatchedViomiVacuum
+from .session import _session_key
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = "xiaomi_viomi.device_info"
+
+
+class ViomiDeviceInfoCache:
+    """Keep the miIO info (model, MAC, firmware) of devices.
+
+    YAML setups validate their device on every start; with a cached info
+    they skip the round-trip and refresh the cache in the background.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._infos: Dict[str, Dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load cached device info from storage."""
+        data = await self._store.async_load()
+        if data:
+            self._infos = data
+
+    def get(self, host: str, token: str) -> Optional[DeviceInfo]:
+        """Return the cached info of a device, None if it was never seen."""
+        raw = self._infos.get(_session_key(host, token))
+        return DeviceInfo(raw) if raw is not None else None
+
+    @callback
+    def async_set(self, host: str, token: str, info: DeviceInfo) -> None:
+        """Cache the info of a device."""
+        key = _session_key(host, token)
+        if self._infos.get(key) == info.raw:
+            return
+
+        self._infos[key] = info.raw
+        self._store.async_delay_save(lambda: self._infos, SESSION_SAVE_DELAY)
+
+    @callback
+    def async_refresh(self, device: PatchedViomiVacuum) -> None:
+        """Refresh the cached info of a device without waiting for it."""
+        self._hass.async_create_task(self._async_refresh(device))
+
+    async def _async_refresh(self, device: PatchedViomiVacuum) -> None:
+        try:
+            info = await device.info()
+        except DeviceException as error:
+            _LOGGER.debug("Refreshing info of %s failed: %s", device.ip, error)
+            return
+
+        self.async_set(device.ip, device.token, info)
+
+
+async def async_get_device_info_cache(hass: HomeAssistant) -> ViomiDeviceInfoCache:
+    """Return the device info cache shared by all Viomi devices."""
+    if DATA_DEVICE_INFO not in hass.data:
+        cache = ViomiDeviceInfoCache(hass)
+        await cache.async_load()
+        hass.data[DATA_DEVICE_INFO] = cache
+
+    return hass.data[DATA_DEVICE_INFO]
@@ -0,0 +1,81 @@
+"""Poll and transport metrics for Xiaomi Viomi integration."""
+import bisect
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.util import dt as dt_util
+
+# Upper bounds in seconds of the poll duration histogram buckets
+POLL_DURATION_BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ViomiMetrics:
+    """Counters of a single device, updated by the transport and coordinator.
+
+    Everything is a plain counter or the last value, so recording costs
+    next to nothing on the hot path.
+    """
+
+    def __init__(self) -> None:
+        """Initialize zeroed metrics."""
+        self.requests = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.rtt_last: Optional[float] = None
+        self.rtt_total = 0.0
+        self.rtt_max = 0.0
+
+        self.polls = 0
+        self.poll_failures = 0
+        self.poll_duration_last: Optional[float] = None
+        # One count per bucket, the last one is for longer polls
+        self.poll_histogram: List[int] = [0] * (len(POLL_DURATION_BUCKETS) + 1)
+        self.last_success: Optional[datetime] = None
+
+    @property
+    def rtt_average(self) -> Optional[float]:
+        """Return the average round-trip time of answered requests."""
+        if not self.requests:
+            return None
+        return self.rtt_total / self.requests
+
+    def record_rtt(self, rtt: float) -> None:
+        """Record the round-trip time of an answered request."""
+        self.requests += 1
+        self.rtt_last = rtt
+        self.rtt_total += rtt
+        self.rtt_max = max(self.rtt_max, rtt)
+
+    def record_poll(self, duration: float, success: bool) -> None:
+        """Record the duration and outcome of a poll."""
+        self.polls += 1
+        self.poll_duration_last = duration
+        self.poll_histogram[bisect.bisect_left(POLL_DURATION_BUCKETS, duration)] += 1
+        if success:
+            self.last_success = dt_util.utcnow()
+        else:
+            self.poll_failures += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return all metrics, e.g. for diagnostics."""
+        # Polls per bucket, keyed by the upper bound of the bucket
+        buckets = [str(bound) for bound in POLL_DURATION_BUCKETS] + ["inf"]
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "rtt_last": self.rtt_last,
+            "rtt_average": self.rtt_average,
+            "rtt_max": self.rtt_max,
+            "polls": self.polls,
+            "poll_failures": self.poll_failures,
+            "poll_duration_last": self.poll_duration_last,
+            "poll_duration_histogram": dict(zip(buckets, self.poll_histogram)),
+            "last_success": (
+                self.last_success.isoformat() if self.last_success else None
+            ),
+        }
@@ -0,0 +1,55 @@
+"""Model specific tables for Xiaomi Viomi integration."""
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Tuple
+
+from miio.integrations.vacuum.viomi.viomivacuum import (
+    ViomiVacuumSpeed,
+    ViomiWaterGrade,
+)
+
+MODEL_VIOMI_V2 = "viomi.vacuum.v6"
+MODEL_STY02YM = "viomi.vacuum.v7"
+MODEL_STYJ02YM = "viomi.vacuum.v8"
+MODEL_VIOMI_SE = "viomi.vacuum.v19"
+
+
+class ViomiModelProfile(NamedTuple):
+    """Fan speed and water grade names of a model, with reverse lookups."""
+
+    fan_speeds: Mapping[str, int]
+    fan_speeds_reverse: Mapping[int, str]
+    fan_speed_list: Tuple[str, ...]
+    water_grades: Mapping[str, int]
+    water_grades_reverse: Mapping[int, str]
+
+
+def _profile(fan_speeds: Mapping[str, int], water_grades: Mapping[str, int]):
+    return ViomiModelProfile(
+        fan_speeds=MappingProxyType(dict(fan_speeds)),
+        fan_speeds_reverse=MappingProxyType({v: k for k, v in fan_speeds.items()}),
+        fan_speed_list=tuple(fan_speeds),
+        water_grades=MappingProxyType(dict(water_grades)),
+        water_grades_reverse=MappingProxyType({v: k for k, v in water_grades.items()}),
+    )
+
+
+DEFAULT_PROFILE = _profile(
+    {speed.name: speed.value for speed in ViomiVacuumSpeed},
+    {grade.name: grade.value for grade in ViomiWaterGrade},
+)
+
+# All known models use miio's defaults so far, a model with other steps
+# gets its own profile here
+MODEL_PROFILES: Mapping[str, ViomiModelProfile] = MappingProxyType(
+    {
+        MODEL_VIOMI_V2: DEFAULT_PROFILE,
+        MODEL_STY02YM: DEFAULT_PROFILE,
+        MODEL_STYJ02YM: DEFAULT_PROFILE,
+        MODEL_VIOMI_SE: DEFAULT_PROFILE,
+    }
+)
+
+
+def get_model_profile(model: str) -> ViomiModelProfile:
+    """Return the tables of a model, miio's defaults for unknown models."""
+    return MODEL_PROFILES.get(model, DEFAULT_PROFILE)
@@ -0,0 +1,94 @@
+"""Pushed state updates for Xiaomi Viomi integration."""
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+from homeassistant.core import callback
+
+from .const import DEVICE_PROPERTIES, PUSH_STALE_AFTER
+
+if TYPE_CHECKING:
+    from .coordinator import ViomiDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+NOTIFICATION_PROPS = "props"
+
+
+def parse_props(params: Any) -> Dict[str, Any]:
+    """Return the known properties of a props notification.
+
+    Firmware sends either a mapping of names to values or a list of
+    name and value pairs.
+    """
+    items: Iterable[Any]
+    if isinstance(params, dict):
+        items = params.items()
+    elif isinstance(params, list):
+        items = (
+            item
+            for item in params
+            if isinstance(item, (list, tuple)) and len(item) == 2
+        )
+    else:
+        return {}
+
+    return {name: value for name, value in items if name in DEVICE_PROPERTIES}
+
+
+class ViomiPushListener:
+    """Apply property notifications of a device to its coordinator.
+
+    The robot sends props notifications to the address which talks to it,
+    so they arrive on the socket of the transport, which stays open as long
+    as the device is polled. While notifications keep coming the
+    coordinator only polls now and then to check for consistency.
+
+    Pushes are best effort: no subscription command is known for these
+    devices, so only notifications the firmware sends on its own arrive.
+    Until they do, and once they stop, the device is polled as usual.
+    """
+
+    def __init__(self, coordinator: "ViomiDataUpdateCoordinator") -> None:
+        """Initialize the listener."""
+        self._coordinator = coordinator
+        self._transport = coordinator.device.transport
+        self.last_push: Optional[float] = None
+        self.pushes = 0
+
+    @property
+    def is_alive(self) -> bool:
+        """Return whether the device pushed state recently."""
+        return (
+            self.last_push is not None
+            and time.monotonic() - self.last_push < PUSH_STALE_AFTER.total_seconds()
+        )
+
+    @callback
+    def async_start(self) -> None:
+        """Start passing notifications to the coordinator."""
+        self._transport.notification_listener = self._handle_notification
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening to notifications."""
+        if self._transport.notification_listener == self._handle_notification:
+            self._transport.notification_listener = None
+
+    @callback
+    def _handle_notification(self, notification: Dict[str, Any]) -> None:
+        if notification.get("method") != NOTIFICATION_PROPS:
+            _LOGGER.debug("Ignoring notification %s", notification.get("method"))
+            return
+
+        properties = parse_props(notification.get("params"))
+        if not properties:
+            return
+
+        if not self.is_alive:
+            _LOGGER.debug(
+                "%s pushes its state, polling less often", self._coordinator.name
+            )
+        self.last_push = time.monotonic()
+        self.pushes += 1
+        self._coordinator.async_push_properties(properties)
@@ -0,0 +1,108 @@
+"""Poll scheduling across devices for Xiaomi Viomi integration."""
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_SCHEDULER, DEFAULT_MAX_CONCURRENT_POLLS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PollCost:
+    """Time spent polling a device."""
+
+    __slots__ = ("polls", "total", "last")
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.polls = 0
+        self.total = 0.0
+        self.last = 0.0
+
+
+class ViomiPollScheduler:
+    """Spread the polls of all Viomi devices over their interval.
+
+    Every device gets an evenly spaced phase within its update interval, so
+    devices with the same interval don't poll on the same tick. At most
+    `max_concurrent` polls run at once, and the time spent polling is
+    accounted per device.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT_POLLS) -> None:
+        """Initialize the scheduler."""
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._devices: List[str] = []
+        self.costs: Dict[str, PollCost] = {}
+
+    @property
+    def total_cost(self) -> float:
+        """Return the seconds spent polling all devices so far."""
+        return sum(cost.total for cost in self.costs.values())
+
+    @callback
+    def async_register(self, key: str) -> None:
+        """Add a device, the phases of all devices are spread again."""
+        if key not in self._devices:
+            self._devices.append(key)
+            self.costs[key] = PollCost()
+
+    @callback
+    def async_unregister(self, key: str) -> None:
+        """Remove a device."""
+        if key in self._devices:
+            self._devices.remove(key)
+            self.costs.pop(key, None)
+
+    def next_poll(self, key: str, interval: timedelta) -> datetime:
+        """Return the time of the next poll of a device.
+
+        Polls are aligned to the device's phase on the wall clock, but are
+        never sooner than half an interval from now.
+        """
+        now = dt_util.utcnow()
+        period = interval.total_seconds()
+        if key not in self._devices or period <= 0:
+            return now + interval
+
+        phase = period * self._devices.index(key) / len(self._devices)
+        earliest = now.timestamp() + period / 2
+        target = math.ceil((earliest - phase) / period) * period + phase
+        return dt_util.utc_from_timestamp(target)
+
+    @asynccontextmanager
+    async def async_poll(self, key: str) -> AsyncIterator[None]:
+        """Wait for a free slot and account the time spent polling."""
+        async with self._slots:
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                elapsed = time.monotonic() - started
+                cost = self.costs.get(key)
+                if cost is not None:
+                    cost.polls += 1
+                    cost.total += elapsed
+                    cost.last = elapsed
+                _LOGGER.debug(
+                    "Polled %s in %.3fs, all devices took %.3fs so far",
+                    key,
+                    elapsed,
+                    self.total_cost,
+                )
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> ViomiPollScheduler:
+    """Return the scheduler shared by all devices."""
+    if DATA_SCHEDULER not in hass.data:
+        hass.data[DATA_SCHEDULER] = ViomiPollScheduler()
+    return hass.data[DATA_SCHEDULER]
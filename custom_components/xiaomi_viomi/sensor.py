@@ -0,0 +1,184 @@
+"""Diagnostic sensors of Xiaomi Viomi integration."""
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Protocol
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.components.xiaomi_miio.device import XiaomiCoordinatedMiioEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME, DATA_BYTES, TIME_MILLISECONDS, TIME_SECONDS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .coordinator import ViomiDataUpdateCoordinator
+from .metrics import ViomiMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _seconds(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds, 3)
+
+
+# mypy takes a Callable field of a frozen dataclass for a method
+class _MetricValue(Protocol):
+    """Function reading the sensor value from the metrics."""
+
+    def __call__(self, metrics: ViomiMetrics) -> Any:
+        """Return the value."""
+
+
+@dataclass(frozen=True)
+class ViomiMetricSensorDescription:
+    """Sensor showing one of the device metrics.
+
+    The entity description is held instead of extended, subclasses of it
+    can't be type checked without Home Assistant type hints.
+    """
+
+    entity: SensorEntityDescription
+    value_fn: _MetricValue
+    attributes_fn: Optional[Callable[[ViomiMetrics], Dict[str, Any]]] = None
+
+
+METRIC_SENSORS = (
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="poll_duration",
+            name="Poll duration",
+            native_unit_of_measurement=TIME_SECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: _seconds(metrics.poll_duration_last),
+        attributes_fn=lambda metrics: {
+            "polls": metrics.polls,
+            "failures": metrics.poll_failures,
+            "histogram": metrics.as_dict()["poll_duration_histogram"],
+        },
+    ),
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="last_successful_poll",
+            name="Last successful poll",
+            device_class=SensorDeviceClass.TIMESTAMP,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: metrics.last_success,
+    ),
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="round_trip_time",
+            name="Round-trip time",
+            native_unit_of_measurement=TIME_MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: _milliseconds(metrics.rtt_last),
+        attributes_fn=lambda metrics: {
+            "average": _milliseconds(metrics.rtt_average),
+            "max": _milliseconds(metrics.rtt_max),
+            "requests": metrics.requests,
+        },
+    ),
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="timeouts",
+            name="Timeouts",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: metrics.timeouts,
+    ),
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="retries",
+            name="Retries",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: metrics.retries,
+    ),
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="bytes_sent",
+            name="Bytes sent",
+            native_unit_of_measurement=DATA_BYTES,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: metrics.bytes_sent,
+    ),
+    ViomiMetricSensorDescription(
+        SensorEntityDescription(
+            key="bytes_received",
+            name="Bytes received",
+            native_unit_of_measurement=DATA_BYTES,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_registry_enabled_default=False,
+        ),
+        value_fn=lambda metrics: metrics.bytes_received,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the diagnostic sensors of a config entry."""
+    name = config_entry.data.get(CONF_NAME, config_entry.title)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    async_add_entities(
+        ViomiMetricSensor(
+            f"{name} {description.entity.name}",
+            config_entry,
+            f"{config_entry.unique_id}_{description.entity.key}",
+            coordinator,
+            description,
+        )
+        for description in METRIC_SENSORS
+    )
+
+
+class ViomiMetricSensor(XiaomiCoordinatedMiioEntity, SensorEntity):
+    """Poll and transport metric of a Viomi vacuum."""
+
+    coordinator: ViomiDataUpdateCoordinator
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, name, entry, unique_id, coordinator, description):
+        """Initialize the sensor."""
+        super().__init__(name, coordinator.device, entry, unique_id, coordinator)
+        self.entity_description = description.entity
+        self._metric: ViomiMetricSensorDescription = description
+
+    @property
+    def available(self) -> bool:
+        """Stay available, metrics matter most while polls fail."""
+        return True
+
+    @property
+    def native_value(self) -> Any:
+        """Return the metric."""
+        return self._metric.value_fn(self.coordinator.metrics)
+
+    @property
+    def extra_state_attributes(self) -> Optional[Dict[str, Any]]:
+        """Return details of the metric."""
+        if self._metric.attributes_fn is None:
+            return None
+        return self._metric.attributes_fn(self.coordinator.metrics)
@@ -0,0 +1,82 @@
+"""Persistent miIO session cache for Xiaomi Viomi integration."""
+import hashlib
+import logging
+from typing import Any, Dict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_SESSIONS, SESSION_SAVE_DELAY, STORAGE_VERSION
+from .device import PatchedViomiVacuum
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = "xiaomi_viomi.sessions"
+
+
+def _session_key(host: str, token: str) -> str:
+    """Key sessions by host and a digest of the token, not the token itself."""
+    digest = hashlib.sha256(token.encode()).hexdigest()[:16]
+    return f"{host}:{digest}"
+
+
+class ViomiSessionCache:
+    """Keep device id, timestamp offset and message id of miIO sessions.
+
+    Sessions are restored into new transports, so entry reloads, restarts
+    and config flow validation don't start with a hello handshake.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._devices: Dict[str, PatchedViomiVacuum] = {}
+
+    async def async_load(self) -> None:
+        """Load cached sessions from storage."""
+        data = await self._store.async_load()
+        if data:
+            self._sessions = data
+
+    @callback
+    def attach(self, device: PatchedViomiVacuum) -> None:
+        """Restore the cached session into a device and track its changes."""
+        transport = device.transport
+        key = _session_key(device.ip, device.token)
+
+        if key in self._sessions:
+            _LOGGER.debug("Restoring miIO session for %s", device.ip)
+            transport.restore_session(self._sessions[key])
+
+        self._devices[key] = device
+
+        @callback
+        def _handshake_done() -> None:
+            self._store.async_delay_save(self._data_to_save, SESSION_SAVE_DELAY)
+
+        transport.session_listener = _handshake_done
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Dict[str, Any]]:
+        """Return the stored sessions updated with the live ones.
+
+        Sessions are read when the save runs, so a save scheduled by a
+        handshake also stores the message ids used since.
+        """
+        for device in self._devices.values():
+            session = device.transport.session
+            if session is not None:
+                # Keyed by the current address, the device may have moved
+                self._sessions[_session_key(device.ip, device.token)] = session
+        return self._sessions
+
+
+async def async_get_session_cache(hass: HomeAssistant) -> ViomiSessionCache:
+    """Return the session cache shared by all Viomi devices."""
+    if DATA_SESSIONS not in hass.data:
+        cache = ViomiSessionCache(hass)
+        await cache.async_load()
+        hass.data[DATA_SESSIONS] = cache
+
+    return hass.data[DATA_SESSIONS]
@@ -0,0 +1,100 @@
+"""Device status snapshot for Xiaomi Viomi integration."""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from miio.integrations.vacuum.viomi.viomivacuum import ERROR_CODES, ViomiVacuumState
+
+from .const import DEVICE_PROPERTIES, STATE_CODE_TO_STATE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ViomiStatusSnapshot:
+    """Decoded get_prop answer of a Viomi vacuum.
+
+    Follows miio's ViomiVacuumStatus, but every field is decoded once when
+    the snapshot is built instead of on each access. Snapshots compare equal
+    when the device reported the same values.
+    """
+
+    __slots__ = (
+        "values",
+        "run_state",
+        "state",
+        "error_code",
+        "error",
+        "battery",
+        "suction_grade",
+        "water_grade",
+        "clean_time",
+        "clean_area",
+        "mop_installed",
+        "mop_mode",
+        "is_on",
+        "charging",
+        "has_map",
+        "has_new_map",
+        "current_map_id",
+    )
+
+    def __init__(self, properties: Mapping[str, Any]) -> None:
+        """Decode the properties, missing ones are None."""
+        self.values: Tuple[Any, ...] = tuple(
+            properties.get(prop) for prop in DEVICE_PROPERTIES
+        )
+
+        self.run_state: Optional[int] = properties.get("run_state")
+        try:
+            self.state = ViomiVacuumState(self.run_state)
+        except ValueError:
+            _LOGGER.warning("Unknown vacuum state: %s", self.run_state)
+            self.state = ViomiVacuumState.Unknown
+
+        self.error_code: Optional[int] = properties.get("err_state")
+        self.error: Optional[str] = (
+            None
+            if self.error_code is None
+            else ERROR_CODES.get(self.error_code, f"Unknown error {self.error_code}")
+        )
+
+        self.battery: Optional[int] = properties.get("battary_life")
+        self.suction_grade: Optional[int] = properties.get("suction_grade")
+        self.water_grade: Optional[int] = properties.get("water_grade")
+        self.clean_time = timedelta(minutes=properties.get("s_time") or 0)
+        self.clean_area: float = properties.get("s_area") or 0
+        self.mop_installed = bool(properties.get("mop_type"))
+        self.mop_mode: Optional[int] = properties.get("is_mop")
+        # Both flags are inverted by the firmware, see ViomiVacuumStatus
+        self.is_on = not properties.get("is_work")
+        self.charging = not properties.get("is_charge")
+        self.has_map = bool(properties.get("has_map"))
+        self.has_new_map = bool(properties.get("has_newmap"))
+        self.current_map_id: Optional[float] = properties.get("cur_mapid")
+
+    @property
+    def activity(self) -> Optional[str]:
+        """Return the Home Assistant vacuum state of the run state."""
+        if self.run_state is None:
+            return None
+        return STATE_CODE_TO_STATE.get(self.run_state)
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Return the raw properties as reported by the device."""
+        return dict(zip(DEVICE_PROPERTIES, self.values))
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the raw values of two snapshots."""
+        if not isinstance(other, ViomiStatusSnapshot):
+            return NotImplemented
+        return self.values == other.values
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        """Return a short representation for debug logs."""
+        return (
+            f"<ViomiStatusSnapshot state={self.state.name} battery={self.battery} "
+            f"error_code={self.error_code}>"
+        )
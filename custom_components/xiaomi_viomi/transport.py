@@ -0,0 +1,424 @@
+"""Native asyncio miIO transport for Xiaomi Viomi integration."""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple, cast
+
+from construct.core import ChecksumError, ConstructError
+from miio import DeviceError, DeviceException
+from miio.exceptions import PayloadDecodeException, RecoverableError
+from miio.protocol import Message
+
+from .const import DEFAULT_MAX_IN_FLIGHT, DEFAULT_RETRY_COUNT, DEFAULT_TIMEOUT
+from .metrics import ViomiMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+MIIO_PORT = 54321
+HELLO_BYTES = bytes.fromhex(
+    "21310020ffffffffffffffffffffffffffffffffffffffffffffffffffffffff"
+)
+
+
+class _MiioDatagramProtocol(asyncio.DatagramProtocol):
+    """Forward received datagrams to the owning transport."""
+
+    def __init__(self, transport: "MiioTransport") -> None:
+        self._owner = transport
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self._owner.datagram_received(data)
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug("%s: socket error: %s", self._owner.host, exc)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._owner.connection_lost()
+
+
+class MiioTransport:
+    """Send miIO requests to a single device from the event loop.
+
+    This mirrors the handshake, encryption and retry logic of
+    miio.miioprotocol.MiIOProtocol, but uses an asyncio datagram endpoint
+    instead of a blocking socket, so no executor thread is held while
+    waiting for the device.
+
+    Up to `max_in_flight` requests are sent back to back with their own
+    message ids, and answers are matched to the requests by id.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        token: str,
+        *,
+        timeout: float = DEFAULT_TIMEOUT,
+        retry_count: int = DEFAULT_RETRY_COUNT,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> None:
+        """Initialize the transport, the endpoint is opened lazily."""
+        self.host = host
+        self.port = MIIO_PORT
+        self.timeout = timeout
+        self.retry_count = retry_count
+        self.max_in_flight = max(1, max_in_flight)
+        self._token = bytes.fromhex(token)
+
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._window: Optional[asyncio.Semaphore] = None
+        self._handshake_lock: Optional[asyncio.Lock] = None
+        self._hello_waiter: Optional[asyncio.Future] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+
+        self._message_id = 0
+        self._device_id = bytes()
+        self._device_ts: Optional[datetime] = None
+        self._device_ts_received_at = 0.0
+
+        self.metrics = ViomiMetrics()
+
+        # Called after every handshake and address change, see `session`
+        self.session_listener: Optional[Callable[[], None]] = None
+        # Called with notifications the device sends unrequested, e.g. props
+        self.notification_listener: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    @property
+    def device_id(self) -> Optional[int]:
+        """Return the miIO device id learned during the handshake."""
+        return int.from_bytes(self._device_id, "big") if self._device_id else None
+
+    @property
+    def session(self) -> Optional[Dict[str, Any]]:
+        """Return the handshake state needed to skip the next handshake.
+
+        The device timestamp is kept as an offset to the wall clock, so the
+        session can be restored after a restart.
+        """
+        if self._device_ts is None:
+            return None
+
+        return {
+            "device_id": self._device_id.hex(),
+            "ts_offset": (
+                self._current_device_ts() - datetime.utcnow()
+            ).total_seconds(),
+            "message_id": self._message_id,
+        }
+
+    def restore_session(self, session: Dict[str, Any]) -> None:
+        """Restore the handshake state returned by `session`."""
+        self._device_id = bytes.fromhex(session["device_id"])
+        self._device_ts = datetime.utcnow() + timedelta(seconds=session["ts_offset"])
+        self._device_ts_received_at = time.monotonic()
+        # Skip ahead, the device ignores ids it has already seen
+        self._message_id = (session["message_id"] + 100) % 9999
+
+    def _current_device_ts(self) -> datetime:
+        assert self._device_ts is not None
+        elapsed = time.monotonic() - self._device_ts_received_at
+        return self._device_ts + timedelta(seconds=elapsed)
+
+    def _update_session(self, device_ts: datetime) -> None:
+        self._device_ts = device_ts
+        self._device_ts_received_at = time.monotonic()
+
+    def datagram_received(self, data: bytes) -> None:
+        """Resolve the pending request a received datagram answers.
+
+        Answers without a pending request are late responses to requests
+        which have already timed out, those are dropped. Notifications,
+        which carry a method instead of a result, are acknowledged and
+        passed to `notification_listener`.
+        """
+        self.metrics.bytes_received += len(data)
+        if len(data) == 32:
+            self._hello_received(data)
+            return
+
+        if not self._pending and self.notification_listener is None:
+            _LOGGER.debug("%s: dropping unexpected datagram", self.host)
+            return
+
+        try:
+            message = Message.parse(data, token=self._token)
+        except ChecksumError as ex:
+            # Without the right token the answer can't be matched to a request
+            for future in self._pending.values():
+                if not future.done():
+                    error = DeviceException(
+                        "Got checksum error which indicates use "
+                        "of an invalid token. "
+                        "Please check your token!"
+                    )
+                    error.__cause__ = ex
+                    future.set_exception(error)
+            return
+        except (ConstructError, PayloadDecodeException) as ex:
+            _LOGGER.debug("%s: unable to parse datagram: %s", self.host, ex)
+            return
+
+        response = message.data.value
+        if isinstance(response, dict) and "method" in response:
+            self._notification_received(response)
+            return
+
+        request_id = response.get("id") if isinstance(response, dict) else None
+        pending = self._pending.get(request_id) if request_id is not None else None
+
+        if pending is None or pending.done():
+            _LOGGER.debug("%s: dropping stale response %s", self.host, response)
+            return
+
+        pending.set_result(message)
+
+    def _notification_received(self, notification: Dict[str, Any]) -> None:
+        _LOGGER.debug("%s:%s <<: %s", self.host, self.port, notification)
+        if self._device_ts is None:
+            _LOGGER.debug("%s: dropping notification without session", self.host)
+            return
+
+        if self._transport is not None and "id" in notification:
+            # The device repeats notifications until they are acknowledged
+            self._transport.sendto(
+                self._build_message({"id": notification["id"], "result": ["ok"]})
+            )
+
+        if self.notification_listener is not None:
+            self.notification_listener(notification)
+
+    def _hello_received(self, data: bytes) -> None:
+        waiter = self._hello_waiter
+        if waiter is None or waiter.done():
+            _LOGGER.debug("%s: dropping unexpected hello", self.host)
+            return
+
+        try:
+            waiter.set_result(Message.parse(data))
+        except ConstructError as ex:
+            _LOGGER.debug("%s: unable to parse hello: %s", self.host, ex)
+
+    def connection_lost(self) -> None:
+        """Forget the endpoint, it is reopened with the next request."""
+        self._transport = None
+
+    def close(self) -> None:
+        """Close the datagram endpoint."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def set_host(self, host: str) -> None:
+        """Talk to the device at another address, e.g. after DHCP moved it.
+
+        The session is kept, it belongs to the device and not its address.
+        The endpoint is reopened with the next request.
+        """
+        self.close()
+        self.host = host
+        if self.session_listener is not None:
+            self.session_listener()
+
+    async def _async_ensure_endpoint(self) -> asyncio.DatagramTransport:
+        if self._transport is None:
+            loop = asyncio.get_running_loop()
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _MiioDatagramProtocol(self),
+                    remote_addr=(self.host, self.port),
+                )
+            except OSError as ex:
+                raise DeviceException(f"Unable to reach {self.host}: {ex}") from ex
+            self._transport = cast(asyncio.DatagramTransport, transport)
+
+        return self._transport
+
+    async def _async_exchange(
+        self, payload: bytes, request_id: Optional[int], timeout: float
+    ) -> Message:
+        """Send a datagram and wait for the answer to it.
+
+        Requests without an id are hello packets.
+        """
+        transport = await self._async_ensure_endpoint()
+
+        future = asyncio.get_running_loop().create_future()
+        if request_id is None:
+            self._hello_waiter = future
+        else:
+            self._pending[request_id] = future
+
+        try:
+            transport.sendto(payload)
+            self.metrics.bytes_sent += len(payload)
+            started = time.monotonic()
+            try:
+                message = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.metrics.timeouts += 1
+                raise
+            self.metrics.record_rtt(time.monotonic() - started)
+            return message
+        finally:
+            if request_id is None:
+                self._hello_waiter = None
+            else:
+                self._pending.pop(request_id, None)
+
+    def _get_handshake_lock(self) -> asyncio.Lock:
+        if self._handshake_lock is None:
+            self._handshake_lock = asyncio.Lock()
+        return self._handshake_lock
+
+    async def _async_ensure_session(self) -> None:
+        async with self._get_handshake_lock():
+            if self._device_ts is None:
+                await self._async_handshake()
+
+    async def _async_hello(self, timeout: float) -> bool:
+        try:
+            message = await self._async_exchange(HELLO_BYTES, None, timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        header = message.header.value
+        self._device_id = header.device_id
+        self._update_session(header.ts)
+
+        _LOGGER.debug(
+            "%s: discovered %s with ts: %s",
+            self.host,
+            self._device_id.hex(),
+            self._device_ts,
+        )
+        if self.session_listener is not None:
+            self.session_listener()
+        return True
+
+    async def _async_handshake(self) -> None:
+        for attempt in range(self.retry_count + 1):
+            if await self._async_hello(self.timeout):
+                return
+            _LOGGER.debug(
+                "%s: no answer to handshake, attempt %s", self.host, attempt + 1
+            )
+
+        raise DeviceException(f"Unable to discover the device {self.host}")
+
+    async def async_probe(self, timeout: Optional[float] = None) -> bool:
+        """Send a single hello and return whether the device answered.
+
+        Unlike requests this is not retried, which makes it a cheap check
+        whether an unreachable device is back. An answer starts a new
+        session.
+        """
+        async with self._get_handshake_lock():
+            return await self._async_hello(timeout or self.timeout)
+
+    def _next_id(self) -> int:
+        self._message_id += 1
+        if self._message_id >= 9999:
+            self._message_id = 1
+        return self._message_id
+
+    def _build_request(
+        self, command: str, parameters: Any, extra_parameters: Optional[Dict]
+    ) -> Tuple[int, bytes]:
+        request_id = self._next_id()
+        request = {
+            "id": request_id,
+            "method": command,
+            "params": parameters if parameters is not None else [],
+        }
+        if extra_parameters is not None:
+            request = {**request, **extra_parameters}
+
+        _LOGGER.debug("%s:%s >>: %s", self.host, self.port, request)
+        return request_id, self._build_message(request)
+
+    def _build_message(self, payload: Dict[str, Any]) -> bytes:
+        header = {
+            "length": 0,
+            "unknown": 0x00000000,
+            "device_id": self._device_id,
+            "ts": self._current_device_ts() + timedelta(seconds=1),
+        }
+        message = {
+            "data": {"value": payload},
+            "header": {"value": header},
+            "checksum": 0,
+        }
+        return Message.build(message, token=self._token)
+
+    async def async_send(
+        self,
+        command: str,
+        parameters: Any = None,
+        *,
+        extra_parameters: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Send a command and return the result of the device.
+
+        :param timeout: Timeout of a single attempt, `timeout` of the
+            transport by default.
+        :raises DeviceException: if the device could not be reached or
+            responded with an error.
+        """
+        if self._window is None:
+            self._window = asyncio.Semaphore(self.max_in_flight)
+
+        async with self._window:
+            return await self._async_send_request(
+                command, parameters, extra_parameters, timeout or self.timeout
+            )
+
+    async def _async_send_request(
+        self,
+        command: str,
+        parameters: Any,
+        extra_parameters: Optional[Dict],
+        timeout: float,
+    ) -> Any:
+        retries_left = self.retry_count
+        while True:
+            await self._async_ensure_session()
+
+            request_id, payload = self._build_request(
+                command, parameters, extra_parameters
+            )
+
+            try:
+                message = await self._async_exchange(payload, request_id, timeout)
+            except asyncio.TimeoutError as ex:
+                if retries_left <= 0:
+                    raise DeviceException("No response from the device") from ex
+
+                _LOGGER.debug(
+                    "Retrying with incremented id, retries left: %s", retries_left
+                )
+                retries_left -= 1
+                self.metrics.retries += 1
+                self._message_id += 100
+                self._device_ts = None
+                continue
+
+            self._update_session(message.header.value.ts)
+
+            response = message.data.value
+            _LOGGER.debug("%s:%s <<: %s", self.host, self.port, response)
+
+            if "error" in response:
+                error = response["error"]
+                if "code" in error and error["code"] == -30001:
+                    if retries_left > 0:
+                        retries_left -= 1
+                        self.metrics.retries += 1
+                        continue
+                    raise DeviceException(
+                        "Unable to recover failed command"
+                    ) from RecoverableError(error)
+                raise DeviceError(error)
+
+            return response.get("result", response)
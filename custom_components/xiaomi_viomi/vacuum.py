@@ -1,27 +1,45 @@
 """Xiaomi Viomi integration."""
 import logging
-from functools import partial
-from typing import Optional
-
-from homeassistant.components.vacuum import ATTR_CLEANED_AREA
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import voluptuous as vol
+from homeassistant.components.vacuum import (
+    ATTR_BATTERY_LEVEL,
+    ATTR_CLEANED_AREA,
+    ATTR_FAN_SPEED,
+)
 from homeassistant.components.vacuum import DOMAIN as PLATFORM_NAME
-from homeassistant.components.vacuum import STATE_ERROR, StateVacuumEntity
+from homeassistant.components.vacuum import (
+    STATE_CLEANING,
+    STATE_ERROR,
+    STATE_IDLE,
+    STATE_PAUSED,
+    STATE_RETURNING,
+    StateVacuumEntity,
+)
 from homeassistant.components.xiaomi_miio import CONF_MODEL
-from homeassistant.components.xiaomi_miio.device import XiaomiMiioEntity
+from homeassistant.components.xiaomi_miio.device import XiaomiCoordinatedMiioEntity
 from homeassistant.config_entries import SOURCE_USER, ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_NAME, CONF_TOKEN, STATE_OFF, STATE_ON
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    CONF_NAME,
+    STATE_OFF,
+    STATE_ON,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from miio import DeviceException
-from miio.click_common import command
-from miio.integrations.vacuum.viomi.viomivacuum import (
-    ViomiVacuum,
-    ViomiVacuumSpeed,
-    ViomiVacuumStatus,
-)
+from miio.integrations.vacuum.roborock.vacuumcontainers import DNDStatus
+from miio.integrations.vacuum.viomi.viomivacuum import ViomiConsumableStatus
 
-from .config_flow import validate_input
+from . import async_setup_coordinator
+from .config_flow import ViomiDeviceHub, validate_input
 from .const import (
     ATTR_CLEANING_TIME,
     ATTR_DO_NOT_DISTURB,
@@ -32,16 +50,48 @@ from .const import (
     ATTR_MAIN_BRUSH_LEFT,
     ATTR_MOP_ATTACHED,
     ATTR_MOP_LEFT,
+    ATTR_SEGMENTS,
     ATTR_SIDE_BRUSH_LEFT,
     ATTR_STATUS,
-    DEVICE_PROPERTIES,
+    ATTR_WATER_GRADE,
+    ATTR_X_COORD,
+    ATTR_Y_COORD,
+    ATTR_ZONE,
+    DOMAIN,
     ERRORS_FALSE_POSITIVE,
-    STATE_CODE_TO_STATE,
+    SERVICE_CLEAN_SEGMENT,
+    SERVICE_CLEAN_ZONE,
+    SERVICE_GOTO,
     SUPPORT_VIOMI,
 )
+from .coordinator import ViomiDataUpdateCoordinator
+from .device import PatchedViomiVacuum
+from .models import get_model_profile
+from .status import ViomiStatusSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
+# Commands writing the same setting, see ViomiCommandQueue
+COMMAND_KEY_MODE = "mode"
+COMMAND_KEY_FAN_SPEED = "fan_speed"
+
+# Attributes restored from the last state until the first poll is in
+RESTORED_ATTRIBUTES = (
+    ATTR_CLEANED_AREA,
+    ATTR_CLEANING_TIME,
+    ATTR_DO_NOT_DISTURB,
+    ATTR_DO_NOT_DISTURB_END,
+    ATTR_DO_NOT_DISTURB_START,
+    ATTR_ERROR,
+    ATTR_FILTER_LEFT,
+    ATTR_MAIN_BRUSH_LEFT,
+    ATTR_MOP_ATTACHED,
+    ATTR_MOP_LEFT,
+    ATTR_SIDE_BRUSH_LEFT,
+    ATTR_STATUS,
+    ATTR_WATER_GRADE,
+)
+
 
 async def async_setup_platform(
     hass: HomeAssistant,
@@ -51,7 +101,10 @@ async def async_setup_platform(
 ) -> None:
     """Set up the Xiaomi Viomi vacuum cleaner robot from a config entry."""
 
-    config = await validate_input(hass, raw_config)
+    # Reuse the cached device info and the connected device, so a restart
+    # doesn't cost an extra info round-trip and handshake
+    hub = ViomiDeviceHub(hass, use_cache=True)
+    config = await validate_input(hass, raw_config, hub)
     entry = ConfigEntry(
         domain=PLATFORM_NAME,
         data=config,
@@ -59,6 +112,7 @@ async def async_setup_platform(
         title=config[CONF_NAME],
         source=SOURCE_USER,
     )
+    await async_setup_coordinator(hass, entry, hub.device)
     await async_setup_entry(hass, entry, async_add_entities)
 
 
@@ -76,47 +130,158 @@ async def async_setup_entry(
 
         hass.config_entries.async_update_entry(config_entry, data=data)
 
-    host = config_entry.data.get(CONF_HOST)
-    token = config_entry.data.get(CONF_TOKEN)
     name = config_entry.data.get(CONF_NAME, config_entry.title)
-
     unique_id = config_entry.unique_id
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
-    # Create handler
-    _LOGGER.debug("Initializing viomi with host %s (token %s...)", host, token[:5])
-    vacuum = PatchedViomiVacuum(ip=host, token=token)
-
-    viomi = ViomiVacuumIntegration(name, vacuum, config_entry, unique_id)
-    async_add_entities([viomi], update_before_add=True)
+    viomi = ViomiVacuumIntegration(name, config_entry, unique_id, coordinator)
+    async_add_entities([viomi])
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_CLEAN_SEGMENT,
+        {
+            vol.Required(ATTR_SEGMENTS): vol.All(
+                cv.ensure_list, [vol.Any(vol.Coerce(int), cv.string)]
+            )
+        },
+        ViomiVacuumIntegration.async_clean_segment.__name__,
+    )
+    platform.async_register_entity_service(
+        SERVICE_CLEAN_ZONE,
+        {
+            vol.Required(ATTR_ZONE): vol.All(
+                cv.ensure_list,
+                [vol.ExactSequence([vol.Coerce(float)] * 4)],
+            )
+        },
+        ViomiVacuumIntegration.async_clean_zone.__name__,
+    )
+    platform.async_register_entity_service(
+        SERVICE_GOTO,
+        {
+            vol.Required(ATTR_X_COORD): vol.Coerce(float),
+            vol.Required(ATTR_Y_COORD): vol.Coerce(float),
+        },
+        ViomiVacuumIntegration.async_goto.__name__,
+    )
 
-class PatchedViomiVacuum(ViomiVacuum):
-    @command()
-    def locate(self):
-        """Locate a device."""
-        self.send("set_resetpos", [1])
 
+class ViomiVacuumIntegration(
+    XiaomiCoordinatedMiioEntity, StateVacuumEntity, RestoreEntity
+):
+    """Xiaomi Viomi integration handler.
 
-class ViomiVacuumIntegration(XiaomiMiioEntity, StateVacuumEntity):
-    """Xiaomi Viomi integration handler."""
+    The first poll runs in the background after setup. Until it is in, the
+    entity shows the state it had before Home Assistant was restarted.
+    """
 
     _device: PatchedViomiVacuum
+    coordinator: ViomiDataUpdateCoordinator
 
-    def __init__(self, name, device, entry, unique_id):
+    def __init__(self, name, entry, unique_id, coordinator):
         """Initialize the Xiaomi vacuum cleaner robot handler."""
-        super().__init__(name, device, entry, unique_id)
+        super().__init__(name, coordinator.device, entry, unique_id, coordinator)
+
+        self._profile = get_model_profile(entry.data.get(CONF_MODEL))
+
+        # Expected state after a command, until a poll confirms or reverts it
+        self._optimistic: Dict[str, Any] = {}
+        self._optimistic_since = 0.0
+
+        # State and attributes derived from the snapshot in `_snapshot`
+        self._snapshot = None
+        self._snapshot_state: Optional[str] = None
+        self._snapshot_attributes: Dict[str, Any] = {}
+        # What was written to HA last, see `_handle_coordinator_update`
+        self._written: Optional[Tuple] = None
+        # Battery and fan speed of the restored state
+        self._restored: Dict[str, Any] = {}
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last known state if the device wasn't polled yet."""
+        await super().async_added_to_hass()
+
+        last_state = await self.async_get_last_state()
+        if last_state is None or self.coordinator.data is not None:
+            return
+
+        _LOGGER.debug("Restoring state %s of %s", last_state.state, self.entity_id)
+        if last_state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            self._snapshot_state = last_state.state
+        self._snapshot_attributes = {
+            key: value
+            for key, value in last_state.attributes.items()
+            if key in RESTORED_ATTRIBUTES
+        }
+        self._restored = {
+            key: last_state.attributes.get(key)
+            for key in (ATTR_BATTERY_LEVEL, ATTR_FAN_SPEED)
+        }
+
+    @property
+    def vacuum_state(self) -> Optional[ViomiStatusSnapshot]:
+        """Return the last polled status of the device."""
+        return self.coordinator.data.status if self.coordinator.data else None
+
+    @property
+    def consumable_state(self) -> Optional[ViomiConsumableStatus]:
+        """Return the last polled state of consumables."""
+        return self.coordinator.data.consumables if self.coordinator.data else None
 
-        self.vacuum_state: Optional[ViomiVacuumStatus] = None
-        self._available = False
+    @property
+    def dnd_state(self) -> Optional[DNDStatus]:
+        """Return the last polled do-not-disturb configuration."""
+        return self.coordinator.data.dnd if self.coordinator.data else None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Drop the optimistic state once a poll sent after the command is in."""
+        if (
+            self._optimistic
+            and self.coordinator.last_update_success
+            and self.coordinator.fetch_started_at >= self._optimistic_since
+        ):
+            _LOGGER.debug("Replacing optimistic state %s", self._optimistic)
+            self._optimistic = {}
+
+        if self._fingerprint() != self._written:
+            self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state to HA and remember what was written."""
+        self._written = self._fingerprint()
+        super().async_write_ha_state()
+
+    def _fingerprint(self) -> Tuple:
+        return (
+            self.available,
+            self.state,
+            self.battery_level,
+            self.fan_speed,
+            self.extra_state_attributes,
+        )
+
+    def _refresh_snapshot(self) -> None:
+        """Derive state and attributes once per coordinator snapshot."""
+        if self._snapshot is self.coordinator.data:
+            return
 
-        self.consumable_state = None
-        self.dnd_state = None
-        self._fan_speeds = None
-        self._fan_speeds_reverse = None
+        self._snapshot = self.coordinator.data
+        self._snapshot_state = self._polled_state()
+        self._snapshot_attributes = self._polled_attributes()
 
     @property
     def state(self) -> Optional[str]:
         """Return the status of the vacuum cleaner."""
+        if "state" in self._optimistic:
+            return self._optimistic["state"]
+
+        self._refresh_snapshot()
+        return self._snapshot_state
+
+    def _polled_state(self) -> Optional[str]:
         if self.vacuum_state is not None:
             # The vacuum reverts back to an idle state after erroring out.
             # We want to keep returning an error until it has been cleared.
@@ -125,17 +290,17 @@ class ViomiVacuumIntegration(XiaomiMiioEntity, StateVacuumEntity):
                     "FAILED error_code: %s, state: %s, state_code: %s",
                     self.vacuum_state.error_code,
                     self.vacuum_state.state,
-                    self.vacuum_state.state.value,
+                    self.vacuum_state.run_state,
                 )
                 return STATE_ERROR
-            try:
-                return STATE_CODE_TO_STATE[int(self.vacuum_state.state.value)]
-            except KeyError:
-                _LOGGER.error(
-                    "STATE not supported: %s, state_code: %s",
-                    self.vacuum_state.state,
-                    self.vacuum_state.state.value,
-                )
+            state = self.vacuum_state.activity
+            if state is not None:
+                return state
+            _LOGGER.error(
+                "STATE not supported: %s, state_code: %s",
+                self.vacuum_state.state,
+                self.vacuum_state.run_state,
+            )
 
         return None
 
@@ -144,71 +309,75 @@ class ViomiVacuumIntegration(XiaomiMiioEntity, StateVacuumEntity):
         """Return the battery level of the vacuum cleaner."""
         if self.vacuum_state is not None:
             return self.vacuum_state.battery
+        return self._restored.get(ATTR_BATTERY_LEVEL)
 
     @property
     def fan_speed(self):
         """Return the fan speed of the vacuum cleaner."""
+        if "fan_speed" in self._optimistic:
+            return self._optimistic["fan_speed"]
+
         if self.vacuum_state is not None:
-            speed = self.vacuum_state.fanspeed.value
-            if speed in self._fan_speeds_reverse:
-                return self._fan_speeds_reverse[speed]
+            speed = self.vacuum_state.suction_grade
+            if speed in self._profile.fan_speeds_reverse:
+                return self._profile.fan_speeds_reverse[speed]
 
             _LOGGER.debug("Unable to find reverse for %s", speed)
 
             return speed
+        return self._restored.get(ATTR_FAN_SPEED)
 
     @property
     def fan_speed_list(self):
         """Get the list of available fan speed steps of the vacuum cleaner."""
-        return list(self._fan_speeds) if self._fan_speeds else []
+        return self._profile.fan_speed_list
 
     @property
     def extra_state_attributes(self):
         """Return the specific state attributes of this vacuum cleaner."""
-        attrs = {}
-        if self.vacuum_state is not None:
+        self._refresh_snapshot()
+        if "state" in self._optimistic and self._snapshot_attributes:
+            return {**self._snapshot_attributes, ATTR_STATUS: self.state}
+        return self._snapshot_attributes
+
+    def _polled_attributes(self) -> Dict[str, Any]:
+        attrs: Dict[str, Any] = {}
+        data = self.coordinator.data
+        if data is not None:
+            status, consumables, dnd = data.status, data.consumables, data.dnd
             attrs.update(
                 {
-                    ATTR_DO_NOT_DISTURB: STATE_ON
-                    if self.dnd_state.enabled
-                    else STATE_OFF,
-                    ATTR_DO_NOT_DISTURB_START: str(self.dnd_state.start),
-                    ATTR_DO_NOT_DISTURB_END: str(self.dnd_state.end),
+                    ATTR_DO_NOT_DISTURB: STATE_ON if dnd.enabled else STATE_OFF,
+                    ATTR_DO_NOT_DISTURB_START: str(dnd.start),
+                    ATTR_DO_NOT_DISTURB_END: str(dnd.end),
                     # Not working --> 'Cleaning mode':
-                    # STATE_ON if self.vacuum_state.in_cleaning else STATE_OFF,
-                    ATTR_CLEANING_TIME: int(
-                        self.vacuum_state.clean_time.total_seconds() / 60
-                    ),
-                    ATTR_CLEANED_AREA: int(self.vacuum_state.clean_area),
+                    # STATE_ON if status.in_cleaning else STATE_OFF,
+                    ATTR_CLEANING_TIME: int(status.clean_time.total_seconds() / 60),
+                    ATTR_CLEANED_AREA: int(status.clean_area),
                     ATTR_MAIN_BRUSH_LEFT: int(
-                        self.consumable_state.main_brush_left.total_seconds() / 3600
+                        consumables.main_brush_left.total_seconds() / 3600
                     ),
                     ATTR_SIDE_BRUSH_LEFT: int(
-                        self.consumable_state.side_brush_left.total_seconds() / 3600
+                        consumables.side_brush_left.total_seconds() / 3600
                     ),
                     ATTR_MOP_LEFT: int(
-                        (
-                            self.consumable_state.mop_total - self.consumable_state.mop
-                        ).total_seconds()
-                        / 3600
+                        (consumables.mop_total - consumables.mop).total_seconds() / 3600
                     ),
                     ATTR_FILTER_LEFT: int(
-                        self.consumable_state.filter_left.total_seconds() / 3600
+                        consumables.filter_left.total_seconds() / 3600
+                    ),
+                    ATTR_STATUS: self._snapshot_state,
+                    ATTR_MOP_ATTACHED: status.mop_installed,
+                    ATTR_WATER_GRADE: self._profile.water_grades_reverse.get(
+                        status.water_grade, status.water_grade
                     ),
-                    ATTR_STATUS: self.state,
-                    ATTR_MOP_ATTACHED: self.vacuum_state.mop_installed,
                 }
             )
 
             if self._got_error():
-                attrs[ATTR_ERROR] = self.vacuum_state.error
+                attrs[ATTR_ERROR] = status.error
         return attrs
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._available
-
     @property
     def supported_features(self) -> int:
         """Flag vacuum cleaner robot features that are supported."""
@@ -218,42 +387,27 @@ class ViomiVacuumIntegration(XiaomiMiioEntity, StateVacuumEntity):
         error_code = self.vacuum_state.error_code if self.vacuum_state else None
         return bool(error_code and error_code not in ERRORS_FALSE_POSITIVE)
 
-    def _get_device_status(self) -> ViomiVacuumStatus:
-        """Override of miio's device.status() because of bug."""
-        result = {}
-        for prop in DEVICE_PROPERTIES:
-            value = self._device.send("get_prop", [prop])
-            result[prop] = value[0] if len(value) else None
-
-        return ViomiVacuumStatus(result)
-
-    def update(self):
-        """Fetch state from the device."""
-        try:
-            state = self._get_device_status()
-            self.vacuum_state = state
-
-            self._fan_speeds = {x.name: x.value for x in list(ViomiVacuumSpeed)}
-            self._fan_speeds_reverse = {v: k for k, v in self._fan_speeds.items()}
+    async def _try_command(self, mask_error, func, *args, key=None, optimistic=None):
+        """Queue a vacuum command handling error messages.
 
-            self.consumable_state = self._device.consumable_status()
-            self.dnd_state = self._device.dnd_status()
-
-            self._available = True
-        except (OSError, DeviceException) as exc:
-            if self._available:
-                self._available = False
-                _LOGGER.warning("Got exception while fetching the state: %s", exc)
-
-    async def _try_command(self, mask_error, func, *args, **kwargs):
-        """Call a vacuum command handling error messages."""
+        Commands with the same key change the same setting, only the last
+        of them is sent if several are queued. Once the command succeeds,
+        the `optimistic` state is shown until the next poll.
+        """
+        submitted_at = time.monotonic()
         try:
-            await self.hass.async_add_executor_job(partial(func, *args, **kwargs))
-            return True
+            await self.coordinator.commands.async_submit(func, *args, key=key)
         except DeviceException as exc:
             _LOGGER.error(mask_error, exc)
             return False
 
+        if optimistic:
+            self._optimistic.update(optimistic)
+            self._optimistic_since = submitted_at
+            self.async_write_ha_state()
+
+        return True
+
     async def async_turn_on(self, **kwargs):
         """Start or resume the cleaning task."""
         await self.async_start()
@@ -268,22 +422,42 @@ class ViomiVacuumIntegration(XiaomiMiioEntity, StateVacuumEntity):
 
     async def async_start(self):
         """Start or resume the cleaning task."""
-        await self._try_command("Unable to start the vacuum: %s", self._device.start)
+        await self._try_command(
+            "Unable to start the vacuum: %s",
+            self._device.start,
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_CLEANING},
+        )
 
     async def async_pause(self):
         """Pause the cleaning task."""
-        await self._try_command("Unable to set start/pause: %s", self._device.pause)
+        await self._try_command(
+            "Unable to set start/pause: %s",
+            self._device.pause,
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_PAUSED},
+        )
 
     async def async_start_pause(self):
         """Start or pause depending on current state."""
-        if self.vacuum_state.is_on:
+        if self.vacuum_state is None:
+            is_on = self.state == STATE_CLEANING
+        else:
+            is_on = self.vacuum_state.is_on
+
+        if is_on:
             await self.async_pause()
         else:
             await self.async_start()
 
     async def async_stop(self, **kwargs):
         """Stop the vacuum cleaner."""
-        await self._try_command("Unable to stop: %s", self._device.stop)
+        await self._try_command(
+            "Unable to stop: %s",
+            self._device.stop,
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_IDLE},
+        )
 
     async def async_locate(self, **kwargs):
         """Locate the vacuum cleaner."""
@@ -295,29 +469,101 @@ class ViomiVacuumIntegration(XiaomiMiioEntity, StateVacuumEntity):
 
     async def async_set_fan_speed(self, fan_speed, **kwargs):
         """Set fan speed."""
-        if fan_speed in self._fan_speeds:
-            fan_speed = ViomiVacuumSpeed(self._fan_speeds[fan_speed])
-        else:
+        speed = self._profile.fan_speeds.get(fan_speed)
+        if speed is None:
             try:
-                fan_speed = ViomiVacuumSpeed(int(fan_speed))
-            except ValueError as exc:
+                speed = int(fan_speed)
+            except ValueError:
+                speed = None
+
+        if speed not in self._profile.fan_speeds_reverse:
+            _LOGGER.error(
+                "Fan speed step not recognized (%s). Valid speeds are: %s",
+                fan_speed,
+                self.fan_speed_list,
+            )
+            return
+
+        await self._try_command(
+            "Unable to set fan speed: %s",
+            self._device.set_fan_speed,
+            speed,
+            key=COMMAND_KEY_FAN_SPEED,
+            optimistic={"fan_speed": self._profile.fan_speeds_reverse[speed]},
+        )
+
+    async def _async_resolve_rooms(self, segments) -> Optional[List[int]]:
+        try:
+            rooms = await self.coordinator.async_get_rooms()
+        except DeviceException as exc:
+            _LOGGER.error("Unable to get the rooms: %s", exc)
+            return None
+
+        by_name = {name.casefold(): room_id for room_id, name in rooms.items()}
+        room_ids = []
+        for segment in segments:
+            if str(segment) in rooms:
+                room_ids.append(int(segment))
+            elif str(segment).casefold() in by_name:
+                room_ids.append(int(by_name[str(segment).casefold()]))
+            else:
                 _LOGGER.error(
-                    "Fan speed step not recognized (%s). Valid speeds are: %s",
-                    exc,
-                    self.fan_speed_list,
+                    "Room not recognized (%s). Valid rooms are: %s",
+                    segment,
+                    ", ".join(f"{name} ({id_})" for id_, name in rooms.items()),
                 )
-                return
+                return None
 
+        return room_ids
+
+    async def async_clean_segment(self, segments, **kwargs):
+        """Clean rooms given by id or name."""
+        room_ids = await self._async_resolve_rooms(segments)
+        if room_ids is None:
+            return
+
+        await self._try_command(
+            "Unable to clean rooms: %s",
+            self._device.start_with_rooms,
+            room_ids,
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_CLEANING},
+        )
+
+    async def async_clean_zone(self, zone, **kwargs):
+        """Clean rectangular zones."""
         await self._try_command(
-            "Unable to set fan speed: %s", self._device.set_fan_speed, fan_speed
+            "Unable to clean zones: %s",
+            self._device.clean_zones,
+            [tuple(rectangle) for rectangle in zone],
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_CLEANING},
+        )
+
+    async def async_goto(self, x_coord, y_coord, **kwargs):
+        """Send the vacuum to a point."""
+        await self._try_command(
+            "Unable to go to the point: %s",
+            self._device.goto,
+            x_coord,
+            y_coord,
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_CLEANING},
         )
 
     async def async_return_to_base(self, **kwargs):
         """Set the vacuum cleaner to return to the dock."""
-        await self._try_command("Unable to return home: %s", self._device.home)
+        await self._try_command(
+            "Unable to return home: %s",
+            self._device.home,
+            key=COMMAND_KEY_MODE,
+            optimistic={"state": STATE_RETURNING},
+        )
 
     async def async_send_command(self, command, params=None, **kwargs):
         """Send raw command."""
+        # A raw command may change settings that are polled in the slow tier
+        self.coordinator.invalidate_slow_tier()
         await self._try_command(
             "Unable to send command to the vacuum: %s",
             self._device.raw_command,
@@ -0,0 +1,39 @@
+"""Websocket API of Xiaomi Viomi integration."""
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .diagnostics import async_get_config_entry_diagnostics
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the websocket commands of the integration."""
+    websocket_api.async_register_command(hass, websocket_diagnostics)
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/diagnostics",
+        vol.Required("entry_id"): str,
+    }
+)
+@websocket_api.async_response
+async def websocket_diagnostics(hass: HomeAssistant, connection, msg) -> None:
+    """Return the diagnostics of a config entry.
+
+    Same data as the diagnostics download of newer Home Assistant versions.
+    """
+    coordinator = hass.data.get(DOMAIN, {}).get(msg["entry_id"])
+    if coordinator is None:
+        connection.send_error(
+            msg["id"], websocket_api.const.ERR_NOT_FOUND, "Unknown Viomi entry"
+        )
+        return
+
+    # Entries of YAML setups aren't registered, the coordinator holds them
+    connection.send_result(
+        msg["id"], await async_get_config_entry_diagnostics(hass, coordinator.entry)
+    )
@@ -1,8 +1,9 @@
 """Tests for the Xiaomi Viomi integration."""
 from typing import Any
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 from homeassistant.components.vacuum import DOMAIN
+from miio import DeviceError
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.xiaomi_viomi.const import DOMAIN as CUSTOM_DOMAIN
@@ -13,7 +14,7 @@ TEST_MODEL = "viomi.vacuum.v8"
 TEST_TOKEN = "ffffffffffffffffffffffffffffffff"
 TEST_NAME = "mocked_vacuum"
 
-MOCKING_SEND_METHOD = "miio.integrations.vacuum.viomi.viomivacuum.ViomiVacuum.send"
+MOCKING_SEND_METHOD = "custom_components.xiaomi_viomi.device.PatchedViomiVacuum.send"
 
 MOCKED_DEVICE_STATE = {
     "battary_life": 100,
@@ -40,6 +41,8 @@ MOCKED_DEVICE_STATE = {
     "zone_data": "0",
 }
 
+MOCKED_SCHEDULES = ["1_0_32_0_0_0_1_1_11_0_1594139992_2_11_Kitchen_13_Bedroom"]
+
 MOCKED_DEVICE_INFO = {
     "model": TEST_MODEL,
     "mac": TEST_MAC,
@@ -64,7 +67,7 @@ def get_mocked_entry():
     )
 
 
-def mocked_viomi_device(device_state_adjustment=None):
+def mocked_viomi_device(device_state_adjustment=None, max_properties=None):
     state = MOCKED_DEVICE_STATE
     if device_state_adjustment is not None:
         state = {**MOCKED_DEVICE_STATE, **device_state_adjustment}
@@ -72,11 +75,11 @@ def mocked_viomi_device(device_state_adjustment=None):
     def _device_mock_method(command: str, parameters: Any = None):
         # Request for getting device state
         if command == "get_prop" and parameters:
-            property_name = parameters[0]
-            if property_name in state:
-                return [state[property_name]]
+            # Emulate firmware which can't handle multi-property requests
+            if max_properties is not None and len(parameters) > max_properties:
+                raise DeviceError({"code": -5001, "message": "invalid_arg"})
 
-            return [None]
+            return [state.get(property_name) for property_name in parameters]
         # Request for getting state of consumables
         elif command == "get_consumables":
             return [0] * 5
@@ -86,7 +89,12 @@ def mocked_viomi_device(device_state_adjustment=None):
         # Request information about the hardware
         elif command == "miIO.info":
             return MOCKED_DEVICE_INFO
+        # Request schedules, which hold the room names
+        elif command == "get_ordertime":
+            return MOCKED_SCHEDULES
 
         return None
 
-    return patch(MOCKING_SEND_METHOD, wraps=_device_mock_method)
+    return patch(
+        MOCKING_SEND_METHOD, new_callable=AsyncMock, side_effect=_device_mock_method
+    )
@@ -1,7 +1,17 @@
 """Fixtures for trsting."""
 import pytest
+import pytest_socket
+from pytest_homeassistant_custom_component.plugins import disable_socket
 
 
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
     yield
+
+
+@pytest.fixture
+def socket_enabled():
+    """Allow sockets for the test, e.g. for the websocket client."""
+    pytest_socket.enable_socket()
+    yield
+    disable_socket(allow_unix_socket=True)
@@ -0,0 +1,58 @@
+"""Smoke test of the benchmarks against simulated devices."""
+import pytest
+import pytest_socket
+from pytest_homeassistant_custom_component.plugins import disable_socket
+
+from benchmarks.bench_polling import main, run_benchmark
+
+
+@pytest.fixture(autouse=True)
+def localhost_socket():
+    """Allow sockets, the simulated devices listen on localhost."""
+    pytest_socket.enable_socket()
+    yield
+    disable_socket(allow_unix_socket=True)
+
+
+def test_benchmark_polling():
+    result = run_benchmark(3, rounds=2, commands=2, rtt=0, jitter=0)
+
+    assert result.robots == 3
+    assert 0 < result.poll_p50_ms <= result.poll_max_ms
+    assert result.commands_per_second > 0
+    # Polling never blocks an executor thread
+    assert result.executor_jobs == 0
+    assert result.memory_per_robot_kib > 0
+    assert result.timeouts == 0
+
+
+def test_benchmark_lossy_link():
+    result = run_benchmark(
+        2, rounds=3, commands=2, rtt=0, jitter=0, loss=0.2, timeout=0.05
+    )
+
+    assert result.timeouts > 0
+    assert result.retries > 0
+
+
+def test_benchmark_cli(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    main(
+        [
+            "--robots",
+            "1,2",
+            "--rounds",
+            "1",
+            "--commands",
+            "1",
+            "--rtt",
+            "0",
+            "--max-properties",
+            "4",
+            "--json",
+            str(output),
+        ]
+    )
+
+    assert "poll_p50_ms" in capsys.readouterr().out
+    assert output.read_text().count('"robots"') == 2
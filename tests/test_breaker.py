@@ -0,0 +1,110 @@
+"""Test the Xiaomi Viomi circuit breaker."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from miio import DeviceException
+
+from custom_components.xiaomi_viomi.breaker import ViomiCircuitBreaker
+from custom_components.xiaomi_viomi.const import (
+    BACKOFF_MIN,
+    BREAKER_FAILURE_THRESHOLD,
+    DOMAIN,
+    UPDATE_INTERVAL_IDLE,
+)
+from tests import MOCKING_SEND_METHOD, get_mocked_entry, mocked_viomi_device
+
+MOCKING_PROBE_METHOD = "custom_components.xiaomi_viomi.device.PatchedViomiVacuum.probe"
+
+
+def test_breaker_backoff():
+    breaker = ViomiCircuitBreaker(
+        threshold=2, minimum=timedelta(seconds=10), maximum=timedelta(seconds=60)
+    )
+    assert not breaker.record_failure()
+    assert not breaker.is_open
+    assert breaker.record_failure()
+    assert breaker.is_open
+
+    with patch("random.random", return_value=1.0):
+        delays = []
+        for _ in range(5):
+            delays.append(breaker.backoff().total_seconds())
+            assert not breaker.record_failure()
+    assert delays == [10, 20, 40, 60, 60]
+
+    with patch("random.random", return_value=0.0):
+        assert breaker.backoff() == timedelta(seconds=30)
+
+    assert breaker.record_success()
+    assert not breaker.is_open
+    assert not breaker.record_success()
+
+
+async def test_coordinator_backs_off_unreachable_device(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    with patch(
+        MOCKING_SEND_METHOD,
+        new_callable=AsyncMock,
+        side_effect=DeviceException("No response from the device"),
+    ) as mock_send, patch(
+        MOCKING_PROBE_METHOD, new_callable=AsyncMock, return_value=False
+    ) as mock_probe:
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            await coordinator.async_refresh()
+        assert coordinator.breaker.is_open
+        assert not coordinator.last_update_success
+        assert BACKOFF_MIN / 2 <= coordinator.update_interval <= BACKOFF_MIN
+        mock_probe.assert_not_called()
+
+        # While the circuit is open only a probe is sent
+        mock_send.reset_mock()
+        await coordinator.async_refresh()
+        mock_send.assert_not_called()
+        mock_probe.assert_awaited_once()
+        assert BACKOFF_MIN <= coordinator.update_interval <= BACKOFF_MIN * 2
+
+    with mocked_viomi_device() as mock_send, patch(
+        MOCKING_PROBE_METHOD, new_callable=AsyncMock, return_value=True
+    ):
+        await coordinator.async_refresh()
+        assert mock_send.called
+
+    assert coordinator.last_update_success
+    assert not coordinator.breaker.is_open
+    assert coordinator.update_interval == UPDATE_INTERVAL_IDLE
+
+
+@pytest.mark.parametrize(
+    "error", [OSError("unreachable"), DeviceException("bad"), asyncio.TimeoutError]
+)
+async def test_coordinator_probe_errors_count_as_failures(hass: HomeAssistant, error):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    with patch(
+        MOCKING_SEND_METHOD,
+        new_callable=AsyncMock,
+        side_effect=DeviceException("No response from the device"),
+    ), patch(MOCKING_PROBE_METHOD, new_callable=AsyncMock, side_effect=error):
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            await coordinator.async_refresh()
+        assert coordinator.breaker.is_open
+
+        # A failing probe backs off further like an unanswered one
+        with patch("random.random", return_value=1.0):
+            await coordinator.async_refresh()
+        assert not coordinator.last_update_success
+        assert coordinator.update_interval == BACKOFF_MIN * 2
@@ -0,0 +1,183 @@
+"""Test the Xiaomi Viomi property capability probing."""
+from datetime import timedelta
+
+from homeassistant.components.vacuum import DOMAIN as VACUUM_DOMAIN
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.xiaomi_viomi import DOMAIN as PLATFORM_NAME
+from custom_components.xiaomi_viomi.capabilities import (
+    STORAGE_KEY,
+    null_probes,
+    prune,
+    pruned_probes,
+    supported_properties,
+)
+from custom_components.xiaomi_viomi.const import (
+    DEVICE_PROPERTIES,
+    DEVICE_PROPERTIES_FAST,
+    DOMAIN,
+    PRUNE_AFTER_PROBES,
+    SESSION_SAVE_DELAY,
+)
+from tests import (
+    MOCKED_DEVICE_STATE,
+    TEST_HOST,
+    TEST_MAC,
+    TEST_MODEL,
+    TEST_NAME,
+    TEST_TOKEN,
+    get_mocked_entry,
+    mocked_viomi_device,
+)
+
+
+def _stored_capabilities():
+    return {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            "models": {f"{TEST_MODEL}:3.5.8_0021": ["run_state", "sw_info"]},
+            "firmware": {TEST_MAC: "3.5.8_0021"},
+        },
+    }
+
+
+def _requested(mock_device_send):
+    return sorted(
+        prop
+        for call in mock_device_send.mock_calls
+        if call.args[0] == "get_prop"
+        for prop in call.args[1]
+    )
+
+
+def test_supported_properties():
+    probes = {}
+    for _ in range(PRUNE_AFTER_PROBES):
+        # A single null doesn't prune a property
+        assert supported_properties(probes) == set(DEVICE_PROPERTIES)
+        probes = null_probes(probes, {"run_state": 5, "mode": 0, "hw_info": None})
+
+    # The firmware is always requested to notice updates
+    supported = supported_properties(probes)
+    assert supported == {"run_state", "mode", "sw_info"}
+    assert prune(DEVICE_PROPERTIES_FAST, supported) == ["mode", "run_state"]
+    assert prune(DEVICE_PROPERTIES_FAST, None) == DEVICE_PROPERTIES_FAST
+
+    # An answer brings a pruned property back
+    probes = null_probes(pruned_probes(supported), {"hw_info": "v1"})
+    assert "hw_info" in supported_properties(probes)
+    assert "cur_mapid" not in supported_properties(probes)
+
+
+async def test_capabilities_pruned_after_probes(hass: HomeAssistant, hass_storage):
+    entry = get_mocked_entry()
+    with mocked_viomi_device({"mop_type": None}) as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        # The first poll requests everything, one null prunes nothing
+        assert _requested(mock_device_send) == sorted(DEVICE_PROPERTIES)
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        assert coordinator.supported == set(DEVICE_PROPERTIES)
+
+        for _ in range(PRUNE_AFTER_PROBES - 1):
+            coordinator.invalidate_slow_tier()
+            await coordinator.async_refresh()
+        supported = {*MOCKED_DEVICE_STATE, "sw_info"} - {"mop_type"}
+        assert coordinator.supported == supported
+
+        # Full polls keep probing everything, fast polls are pruned
+        mock_device_send.reset_mock()
+        coordinator.invalidate_slow_tier()
+        await coordinator.async_refresh()
+        assert _requested(mock_device_send) == sorted(DEVICE_PROPERTIES)
+
+        mock_device_send.reset_mock()
+        await coordinator.async_refresh()
+        assert _requested(mock_device_send) == sorted(
+            set(DEVICE_PROPERTIES_FAST) - {"mop_type"}
+        )
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=SESSION_SAVE_DELAY + 1)
+    )
+    await hass.async_block_till_done()
+
+    data = hass_storage[STORAGE_KEY]["data"]
+    assert data["firmware"][TEST_MAC] is None
+    assert data["models"][f"{TEST_MODEL}:None"] == sorted(supported)
+
+
+async def test_capabilities_restored(hass: HomeAssistant, hass_storage):
+    entry = get_mocked_entry()
+    hass_storage[STORAGE_KEY] = _stored_capabilities()
+
+    with mocked_viomi_device(
+        {"sw_info": "3.5.8_0021", "mop_type": None}
+    ) as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        # Stored properties stay pruned, answered ones are polled again
+        assert coordinator.supported == (
+            {*MOCKED_DEVICE_STATE, "sw_info"} - {"mop_type"}
+        )
+        mock_device_send.reset_mock()
+        await coordinator.async_refresh()
+
+    assert _requested(mock_device_send) == sorted(
+        set(DEVICE_PROPERTIES_FAST) - {"mop_type"}
+    )
+    assert coordinator.data.status.run_state == 5
+
+
+async def test_capabilities_reprobed_after_update(hass: HomeAssistant, hass_storage):
+    entry = get_mocked_entry()
+    hass_storage[STORAGE_KEY] = _stored_capabilities()
+
+    with mocked_viomi_device({"sw_info": "3.5.8_0030"}) as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+
+        # Nothing is pruned for the new firmware until it was probed
+        assert coordinator.supported == set(DEVICE_PROPERTIES)
+        mock_device_send.reset_mock()
+        await coordinator.async_refresh()
+
+    assert _requested(mock_device_send) == sorted(DEVICE_PROPERTIES_FAST)
+
+
+async def test_capabilities_of_yaml_setup_keyed_by_mac(
+    hass: HomeAssistant, hass_storage
+):
+    config = {
+        VACUUM_DOMAIN: [
+            {
+                "platform": PLATFORM_NAME,
+                "host": TEST_HOST,
+                "token": TEST_TOKEN,
+                "name": TEST_NAME,
+            }
+        ]
+    }
+    with mocked_viomi_device({"sw_info": "3.5.8_0021"}):
+        await async_setup_component(hass, VACUUM_DOMAIN, config)
+        await hass.async_block_till_done()
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=SESSION_SAVE_DELAY + 1)
+    )
+    await hass.async_block_till_done()
+
+    # YAML entries get a new id with every start, the MAC stays the same
+    data = hass_storage[STORAGE_KEY]["data"]
+    assert data["firmware"] == {TEST_MAC: "3.5.8_0021"}
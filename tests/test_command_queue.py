@@ -0,0 +1,122 @@
+"""Test the Xiaomi Viomi command queue."""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from homeassistant.components.vacuum import (
+    ATTR_FAN_SPEED,
+)
+from homeassistant.components.vacuum import DOMAIN as VACUUM_DOMAIN
+from homeassistant.components.vacuum import (
+    SERVICE_SET_FAN_SPEED,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+from miio import DeviceException
+
+from custom_components.xiaomi_viomi.command_queue import ViomiCommandQueue
+from tests import get_entity_id, get_mocked_entry, mocked_viomi_device
+
+
+async def test_command_queue_coalesces_same_key(hass: HomeAssistant):
+    on_drained = AsyncMock()
+    queue = ViomiCommandQueue(hass, on_drained)
+    sent = []
+
+    async def command(value):
+        sent.append(value)
+        return value
+
+    results = await asyncio.gather(
+        queue.async_submit(command, "first"),
+        queue.async_submit(command, 1, key="fan_speed"),
+        queue.async_submit(command, 2, key="fan_speed"),
+        queue.async_submit(command, 3, key="fan_speed"),
+    )
+    await hass.async_block_till_done()
+
+    assert sent == ["first", 3]
+    assert results == ["first", 3, 3, 3]
+    assert queue.is_idle
+    on_drained.assert_awaited_once()
+
+
+async def test_command_queue_fifo_without_key(hass: HomeAssistant):
+    queue = ViomiCommandQueue(hass, AsyncMock())
+    sent = []
+
+    async def command(value):
+        await asyncio.sleep(0)
+        sent.append(value)
+
+    await asyncio.gather(*(queue.async_submit(command, index) for index in range(5)))
+    await hass.async_block_till_done()
+
+    assert sent == [0, 1, 2, 3, 4]
+
+
+async def test_command_queue_error_reaches_all_waiters(hass: HomeAssistant):
+    queue = ViomiCommandQueue(hass, AsyncMock())
+    command = AsyncMock(side_effect=DeviceException("offline"))
+
+    results = await asyncio.gather(
+        queue.async_submit(command, 1, key="mode"),
+        queue.async_submit(command, 2, key="mode"),
+        return_exceptions=True,
+    )
+    await hass.async_block_till_done()
+
+    assert command.await_count == 1
+    assert all(isinstance(result, DeviceException) for result in results)
+    assert queue.is_idle
+
+
+async def test_command_queue_fan_speed_burst(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device() as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        mock_device_send.reset_mock()
+
+        await asyncio.gather(
+            *(
+                hass.services.async_call(
+                    VACUUM_DOMAIN,
+                    SERVICE_SET_FAN_SPEED,
+                    {ATTR_ENTITY_ID: get_entity_id(), ATTR_FAN_SPEED: speed},
+                    blocking=True,
+                )
+                for speed in ("Silent", "Standard", "Turbo")
+            )
+        )
+        await hass.async_block_till_done()
+
+        suction = [
+            call.args[1]
+            for call in mock_device_send.mock_calls
+            if call.args[0] == "set_suction"
+        ]
+        assert suction == [[3]]
+
+
+@pytest.mark.parametrize("key", [None, "mode"])
+async def test_command_queue_poll_waits_for_commands(hass: HomeAssistant, key):
+    queue = ViomiCommandQueue(hass, AsyncMock())
+    release = asyncio.Event()
+
+    async def command():
+        await release.wait()
+
+    task = hass.async_create_task(queue.async_submit(command, key=key))
+    await asyncio.sleep(0)
+    assert not queue.is_idle
+
+    waiter = hass.async_create_task(queue.async_wait_idle())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    release.set()
+    await task
+    await waiter
+    assert queue.is_idle
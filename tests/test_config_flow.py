@@ -1,8 +1,11 @@
 """Test the Xiaomi Viomi integration config flow."""
 from collections import namedtuple
+from types import SimpleNamespace
 from unittest.mock import PropertyMock, patch
 
+import pytest
 from homeassistant import config_entries, setup
+from homeassistant.components.zeroconf import ZeroconfServiceInfo
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import (
     RESULT_TYPE_ABORT,
@@ -12,7 +15,26 @@ from homeassistant.data_entry_flow import (
 
 from custom_components.xiaomi_viomi.config_flow import CannotConnect
 from custom_components.xiaomi_viomi.const import DOMAIN
-from tests import TEST_HOST, TEST_MAC, TEST_MODEL, TEST_NAME, TEST_TOKEN
+from custom_components.xiaomi_viomi.discovery import DiscoveredDevice
+from tests import (
+    TEST_HOST,
+    TEST_MAC,
+    TEST_MODEL,
+    TEST_NAME,
+    TEST_TOKEN,
+    get_mocked_entry,
+)
+
+MOCKING_SCAN_METHOD = (
+    "custom_components.xiaomi_viomi.discovery.ViomiDiscovery.async_scan"
+)
+
+
+@pytest.fixture(autouse=True)
+def mocked_scan():
+    """Find no devices on the network unless a test says otherwise."""
+    with patch(MOCKING_SCAN_METHOD, return_value=[]) as scan:
+        yield scan
 
 
 async def test_form(hass: HomeAssistant) -> None:
@@ -161,3 +183,123 @@ async def test_already_configured(hass: HomeAssistant) -> None:
 
         assert result["type"] == RESULT_TYPE_ABORT
         assert result["reason"] == "already_configured"
+
+
+async def test_pick_discovered_device(hass: HomeAssistant, mocked_scan) -> None:
+    """Test a discovered vacuum is offered and its host suggested."""
+    mocked_scan.return_value = [
+        DiscoveredDevice(TEST_HOST, 0x1234, TEST_MODEL, TEST_MAC),
+        DiscoveredDevice("1.1.1.2", 0x1235),
+    ]
+    flow_result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+
+    assert flow_result["type"] == RESULT_TYPE_FORM
+    assert flow_result["step_id"] == "pick_device"
+    choices = flow_result["data_schema"].schema["device"].container
+    assert choices == {
+        TEST_HOST: f"{TEST_MODEL} ({TEST_HOST})",
+        "1.1.1.2": "Unknown miIO device (1.1.1.2)",
+    }
+
+    result = await hass.config_entries.flow.async_configure(
+        flow_result["flow_id"], {"device": TEST_HOST}
+    )
+
+    assert result["step_id"] == "user"
+    host = next(key for key in result["data_schema"].schema if key == "host")
+    assert host.description == {"suggested_value": TEST_HOST}
+
+
+async def test_pick_manual_entry(hass: HomeAssistant, mocked_scan) -> None:
+    """Test the address can be entered instead of picking a vacuum."""
+    mocked_scan.return_value = [DiscoveredDevice(TEST_HOST, 0x1234)]
+    flow_result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+
+    result = await hass.config_entries.flow.async_configure(
+        flow_result["flow_id"], {"device": TEST_HOST, "manual": True}
+    )
+
+    assert result["step_id"] == "user"
+    host = next(key for key in result["data_schema"].schema if key == "host")
+    assert host.description == {"suggested_value": None}
+
+
+async def test_pick_skips_configured_devices(hass: HomeAssistant, mocked_scan) -> None:
+    """Test configured vacuums are not offered again."""
+    get_mocked_entry().add_to_hass(hass)
+    mocked_scan.return_value = [DiscoveredDevice(TEST_HOST, 0x1234)]
+
+    flow_result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+
+    assert flow_result["step_id"] == "user"
+
+
+async def test_zeroconf_discovery(hass: HomeAssistant) -> None:
+    """Test an announced vacuum starts a flow asking for its token."""
+    flow_result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": config_entries.SOURCE_ZEROCONF},
+        data=ZeroconfServiceInfo(
+            host=TEST_HOST,
+            port=54321,
+            hostname="viomi-vacuum-v8_miio4660.local.",
+            type="_miio._udp.local.",
+            name="viomi-vacuum-v8_miio4660._miio._udp.local.",
+            properties={"mac": TEST_MAC.replace(":", "").upper()},
+        ),
+    )
+
+    assert flow_result["type"] == RESULT_TYPE_FORM
+    assert flow_result["step_id"] == "user"
+    flow = hass.config_entries.flow.async_get(flow_result["flow_id"])
+    assert flow["context"]["unique_id"] == TEST_MAC
+    assert flow["context"]["title_placeholders"] == {
+        "name": f"{TEST_MODEL} ({TEST_HOST})"
+    }
+
+
+async def test_zeroconf_discovery_configured(hass: HomeAssistant) -> None:
+    """Test an announced vacuum which is already configured is ignored."""
+    entry = get_mocked_entry()
+    entry.unique_id = TEST_MAC
+    entry.add_to_hass(hass)
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": config_entries.SOURCE_ZEROCONF},
+        data=ZeroconfServiceInfo(
+            host="1.1.1.2",
+            port=54321,
+            hostname="viomi-vacuum-v8_miio4660.local.",
+            type="_miio._udp.local.",
+            name="viomi-vacuum-v8_miio4660._miio._udp.local.",
+            properties={"mac": TEST_MAC},
+        ),
+    )
+
+    assert result["type"] == RESULT_TYPE_ABORT
+    assert result["reason"] == "already_configured"
+    assert entry.data["host"] == "1.1.1.2"
+
+
+async def test_dhcp_discovery_other_device(hass: HomeAssistant) -> None:
+    """Test other Xiaomi devices getting an address are ignored."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": config_entries.SOURCE_DHCP},
+        # Like DhcpServiceInfo, whose module needs the dhcp requirements
+        data=SimpleNamespace(
+            ip=TEST_HOST,
+            hostname="roborock-vacuum-s5_miio1234",
+            macaddress=TEST_MAC,
+        ),
+    )
+
+    assert result["type"] == RESULT_TYPE_ABORT
+    assert result["reason"] == "not_viomi_device"
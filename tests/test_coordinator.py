@@ -0,0 +1,135 @@
+"""Test the Xiaomi Viomi data update coordinator."""
+import pytest
+from homeassistant.components.vacuum import DOMAIN as VACUUM_DOMAIN
+from homeassistant.components.vacuum import SERVICE_START, STATE_DOCKED
+from homeassistant.core import HomeAssistant
+
+from custom_components.xiaomi_viomi.const import (
+    DEVICE_PROPERTIES,
+    DEVICE_PROPERTIES_FAST,
+    DOMAIN,
+    UPDATE_INTERVAL,
+    UPDATE_INTERVAL_ACTIVE,
+    UPDATE_INTERVAL_IDLE,
+)
+from custom_components.xiaomi_viomi.coordinator import ViomiDataUpdateCoordinator
+from tests import get_entity_id, get_mocked_entry, mocked_viomi_device
+
+
+def _requested(mock_device_send):
+    methods = [call.args[0] for call in mock_device_send.mock_calls]
+    properties = [
+        prop
+        for call in mock_device_send.mock_calls
+        if call.args[0] == "get_prop"
+        for prop in call.args[1]
+    ]
+    return methods, properties
+
+
+async def test_coordinator_shared_snapshot(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device() as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        assert isinstance(coordinator, ViomiDataUpdateCoordinator)
+        assert coordinator.data.status.battery == 100
+
+        methods, properties = _requested(mock_device_send)
+        assert methods.count("get_consumables") == 1
+        assert methods.count("get_notdisturb") == 1
+        assert sorted(properties) == sorted(DEVICE_PROPERTIES)
+
+        state = hass.states.get(get_entity_id())
+        assert state.state == STATE_DOCKED
+
+
+async def test_coordinator_slow_tier(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device() as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        consumables = coordinator.data.consumables
+
+        # Slow tier is served from the cache between slow polls
+        mock_device_send.reset_mock()
+        await coordinator.async_refresh()
+
+        methods, properties = _requested(mock_device_send)
+        assert "get_consumables" not in methods
+        assert "get_notdisturb" not in methods
+        assert sorted(properties) == sorted(DEVICE_PROPERTIES_FAST)
+        assert coordinator.data.consumables is consumables
+        assert coordinator.data.status.has_map
+
+        # Slow tier is requested again once invalidated
+        mock_device_send.reset_mock()
+        coordinator.invalidate_slow_tier()
+        await coordinator.async_refresh()
+
+        methods, properties = _requested(mock_device_send)
+        assert methods.count("get_consumables") == 1
+        assert methods.count("get_notdisturb") == 1
+        assert sorted(properties) == sorted(DEVICE_PROPERTIES)
+
+
+async def test_coordinator_unload(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert entry.entry_id in hass.data[DOMAIN]
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert entry.entry_id not in hass.data[DOMAIN]
+
+
+@pytest.mark.parametrize(
+    "run_state,expected_interval",
+    [
+        (5, UPDATE_INTERVAL_IDLE),
+        (1, UPDATE_INTERVAL_IDLE),
+        (3, UPDATE_INTERVAL_ACTIVE),
+        (4, UPDATE_INTERVAL_ACTIVE),
+        (9000, UPDATE_INTERVAL),
+    ],
+)
+async def test_coordinator_adaptive_interval(
+    hass: HomeAssistant, run_state, expected_interval
+):
+    entry = get_mocked_entry()
+    with mocked_viomi_device({"run_state": run_state}):
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        assert coordinator.update_interval == expected_interval
+
+
+async def test_coordinator_fast_polling_after_command(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        assert coordinator.update_interval == UPDATE_INTERVAL_IDLE
+
+        await hass.services.async_call(
+            VACUUM_DOMAIN, SERVICE_START, {"entity_id": get_entity_id()}, blocking=True
+        )
+        await hass.async_block_till_done()
+
+        assert coordinator.update_interval == UPDATE_INTERVAL_ACTIVE
@@ -0,0 +1,93 @@
+"""Test the Xiaomi Viomi diagnostics."""
+from homeassistant.components.vacuum import DOMAIN as VACUUM_DOMAIN
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.xiaomi_viomi import DOMAIN as PLATFORM_NAME
+from custom_components.xiaomi_viomi.const import DOMAIN
+from custom_components.xiaomi_viomi.diagnostics import (
+    REDACTED,
+    async_get_config_entry_diagnostics,
+)
+from tests import (
+    TEST_HOST,
+    TEST_NAME,
+    TEST_TOKEN,
+    get_mocked_entry,
+    mocked_viomi_device,
+)
+
+
+async def test_diagnostics(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert diagnostics["entry"]["data"]["token"] == REDACTED
+    assert diagnostics["metrics"]["polls"] == 1
+    assert diagnostics["poll_cost"]["polls"] == 1
+    assert not diagnostics["circuit_breaker"]["open"]
+    assert diagnostics["push"] == {"alive": False, "pushes": 0}
+    assert diagnostics["status"]["run_state"] == 5
+
+    transport = hass.data[DOMAIN][entry.entry_id].device.transport
+    transport.notification_listener(
+        {"id": 1, "method": "props", "params": {"run_state": 3}}
+    )
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["push"] == {"alive": True, "pushes": 1}
+
+
+async def test_diagnostics_websocket(hass: HomeAssistant, hass_ws_client):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        client = await hass_ws_client(hass)
+        await client.send_json(
+            {"id": 1, "type": f"{DOMAIN}/diagnostics", "entry_id": entry.entry_id}
+        )
+        result = await client.receive_json()
+        assert result["success"]
+        assert result["result"]["metrics"]["polls"] == 1
+
+        await client.send_json(
+            {"id": 2, "type": f"{DOMAIN}/diagnostics", "entry_id": "unknown"}
+        )
+        result = await client.receive_json()
+        assert not result["success"]
+
+
+async def test_diagnostics_websocket_yaml_setup(hass: HomeAssistant, hass_ws_client):
+    config = {
+        VACUUM_DOMAIN: [
+            {
+                "platform": PLATFORM_NAME,
+                "host": TEST_HOST,
+                "token": TEST_TOKEN,
+                "name": TEST_NAME,
+            }
+        ]
+    }
+    with mocked_viomi_device():
+        await async_setup_component(hass, VACUUM_DOMAIN, config)
+        await hass.async_block_till_done()
+
+        # The entry of a YAML setup isn't registered
+        (entry_id,) = hass.data[DOMAIN]
+        assert hass.config_entries.async_get_entry(entry_id) is None
+
+        client = await hass_ws_client(hass)
+        await client.send_json(
+            {"id": 1, "type": f"{DOMAIN}/diagnostics", "entry_id": entry_id}
+        )
+        result = await client.receive_json()
+        assert result["success"]
+        assert result["result"]["entry"]["title"] == TEST_NAME
+        assert result["result"]["entry"]["data"]["token"] == REDACTED
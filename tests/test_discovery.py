@@ -0,0 +1,197 @@
+"""Test LAN discovery against simulated devices."""
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_socket
+from homeassistant.core import HomeAssistant
+from miio import DeviceException
+from pytest_homeassistant_custom_component.plugins import disable_socket
+
+from benchmarks.simulator import async_start_simulator
+from custom_components.xiaomi_viomi.const import (
+    BREAKER_FAILURE_THRESHOLD,
+    DOMAIN,
+    UPDATE_INTERVAL_ACTIVE,
+)
+from custom_components.xiaomi_viomi.discovery import (
+    DiscoveredDevice,
+    ViomiDiscovery,
+    async_broadcast_hello,
+    async_probe_host,
+    parse_announced_name,
+)
+from tests import (
+    MOCKING_SEND_METHOD,
+    TEST_MAC,
+    get_mocked_entry,
+    mocked_viomi_device,
+)
+
+MOCKING_FIND_METHOD = (
+    "custom_components.xiaomi_viomi.discovery.ViomiDiscovery.async_find"
+)
+MOCKING_PROBE_METHOD = "custom_components.xiaomi_viomi.device.PatchedViomiVacuum.probe"
+
+
+@pytest.fixture(autouse=True)
+def localhost_socket():
+    """Allow sockets, the simulated devices listen on localhost."""
+    pytest_socket.enable_socket()
+    yield
+    disable_socket(allow_unix_socket=True)
+
+
+def test_parse_announced_name():
+    assert parse_announced_name("viomi-vacuum-v8_miio4660._miio._udp.local.") == (
+        "viomi.vacuum.v8",
+        4660,
+    )
+    assert parse_announced_name("viomi-vacuum-v13_miap1A2B") == (
+        "viomi.vacuum.v13",
+        None,
+    )
+    assert parse_announced_name("android-phone") == (None, None)
+
+
+async def test_broadcast_hello_collects_responders():
+    server, _, port = await async_start_simulator(device_id=0x1234)
+    try:
+        responders = await async_broadcast_hello(0.1, "127.0.0.1", port)
+    finally:
+        server.close()
+
+    assert responders == {"127.0.0.1": 0x1234}
+
+
+async def test_probe_host_without_answer():
+    server, device, port = await async_start_simulator(loss=1.0)
+    try:
+        assert await async_probe_host("127.0.0.1", 0.05, port) is None
+    finally:
+        server.close()
+    assert device.dropped == 1
+
+
+async def test_scan_probes_announced_devices_concurrently():
+    """Unreachable announced hosts cost a single timeout, not one each."""
+    server, _, port = await async_start_simulator(device_id=4660)
+    discovery = ViomiDiscovery(port)
+    discovery.async_announce(
+        DiscoveredDevice("127.0.0.1", 4660, "viomi.vacuum.v8", "f2:ff:ff:ff:ff:ff")
+    )
+    for index in range(2, 10):
+        discovery.async_announce(DiscoveredDevice(f"127.0.0.{index}"))
+
+    started = time.monotonic()
+    try:
+        # Nothing answers the broadcast address, the device is probed
+        devices = await discovery.async_scan(0.2, address="127.255.255.254")
+    finally:
+        server.close()
+
+    assert time.monotonic() - started < 1
+    assert devices == [
+        DiscoveredDevice("127.0.0.1", 4660, "viomi.vacuum.v8", "f2:ff:ff:ff:ff:ff")
+    ]
+
+
+async def test_scan_filters_other_models():
+    server, _, port = await async_start_simulator(device_id=77)
+    discovery = ViomiDiscovery(port)
+    discovery.async_announce(DiscoveredDevice("127.0.0.2", 77, "roborock.vacuum.s5"))
+
+    try:
+        devices = await discovery.async_scan(0.1, address="127.0.0.1")
+    finally:
+        server.close()
+
+    # Matched by device id, the broadcast answer came from another address
+    assert devices == []
+
+
+async def test_find_by_device_id():
+    server, _, port = await async_start_simulator(device_id=4660)
+    discovery = ViomiDiscovery(port)
+    try:
+        assert await discovery.async_find(4660, None, 0.1, "127.0.0.1") == ("127.0.0.1")
+        assert await discovery.async_find(4661, None, 0.1, "127.0.0.1") is None
+    finally:
+        server.close()
+
+
+async def test_find_by_announced_mac():
+    discovery = ViomiDiscovery()
+    discovery.async_announce(DiscoveredDevice("1.1.1.2", mac=TEST_MAC))
+
+    # Without a device id nothing is broadcast
+    with patch(
+        "custom_components.xiaomi_viomi.discovery.async_broadcast_hello"
+    ) as broadcast:
+        assert await discovery.async_find(None, TEST_MAC) == "1.1.1.2"
+    broadcast.assert_not_called()
+
+
+async def _async_setup_coordinator(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    return entry, hass.data[DOMAIN][entry.entry_id]
+
+
+async def test_coordinator_follows_moved_device(hass: HomeAssistant):
+    entry, coordinator = await _async_setup_coordinator(hass)
+
+    with patch(
+        MOCKING_SEND_METHOD,
+        new_callable=AsyncMock,
+        side_effect=DeviceException("No response from the device"),
+    ), patch(MOCKING_FIND_METHOD, return_value="1.1.1.2") as mock_find:
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            await coordinator.async_refresh()
+
+    # Looked for once the failures were sustained, not on every failure
+    mock_find.assert_awaited_once_with(None, TEST_MAC)
+    assert coordinator.device.ip == "1.1.1.2"
+    assert coordinator.device.transport.host == "1.1.1.2"
+    assert entry.data["host"] == "1.1.1.2"
+    assert coordinator.update_interval == UPDATE_INTERVAL_ACTIVE
+
+    with mocked_viomi_device(), patch(
+        MOCKING_PROBE_METHOD, new_callable=AsyncMock, return_value=True
+    ):
+        await coordinator.async_refresh()
+
+    # Moved without reloading the entry
+    assert hass.data[DOMAIN][entry.entry_id] is coordinator
+    assert coordinator.last_update_success
+    assert not coordinator.breaker.is_open
+
+
+async def test_coordinator_rediscovers_while_probing(hass: HomeAssistant):
+    entry, coordinator = await _async_setup_coordinator(hass)
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        coordinator.breaker.record_failure()
+
+    with mocked_viomi_device(), patch(
+        MOCKING_PROBE_METHOD, new_callable=AsyncMock, side_effect=[False, True]
+    ), patch(MOCKING_FIND_METHOD, return_value="1.1.1.2"):
+        await coordinator.async_refresh()
+
+    assert coordinator.device.ip == "1.1.1.2"
+    assert coordinator.last_update_success
+
+
+async def test_entry_host_update_moves_device_live(hass: HomeAssistant):
+    entry, coordinator = await _async_setup_coordinator(hass)
+
+    with patch.object(hass.config_entries, "async_reload") as mock_reload:
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, "host": "1.1.1.3"}
+        )
+        await hass.async_block_till_done()
+
+    mock_reload.assert_not_called()
+    assert coordinator.device.ip == "1.1.1.3"
@@ -0,0 +1,103 @@
+"""Test the persistent device info cache."""
+from unittest.mock import patch
+
+from homeassistant.components.vacuum import DOMAIN, STATE_DOCKED
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from miio import DeviceException
+
+from custom_components.xiaomi_viomi import DOMAIN as PLATFORM_NAME
+from custom_components.xiaomi_viomi.info_cache import (
+    STORAGE_KEY,
+    async_get_device_info_cache,
+)
+from custom_components.xiaomi_viomi.session import _session_key
+from tests import (
+    MOCKED_DEVICE_INFO,
+    TEST_HOST,
+    TEST_MODEL,
+    TEST_NAME,
+    TEST_TOKEN,
+    get_entity_id,
+    mocked_viomi_device,
+)
+
+CONFIG = {
+    DOMAIN: [
+        {
+            "platform": PLATFORM_NAME,
+            "host": TEST_HOST,
+            "token": TEST_TOKEN,
+            "name": TEST_NAME,
+        }
+    ]
+}
+
+
+def _cache_storage(info):
+    return {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {_session_key(TEST_HOST, TEST_TOKEN): info},
+    }
+
+
+async def test_platform_setup_caches_device_info(hass: HomeAssistant, hass_storage):
+    with mocked_viomi_device():
+        await async_setup_component(hass, DOMAIN, CONFIG)
+        await hass.async_block_till_done()
+
+    cache = await async_get_device_info_cache(hass)
+    info = cache.get(TEST_HOST, TEST_TOKEN)
+    assert info is not None
+    assert info.model == TEST_MODEL
+    assert cache.get(TEST_HOST, "0" * 32) is None
+
+
+async def test_platform_setup_uses_cached_device_info(
+    hass: HomeAssistant, hass_storage
+):
+    hass_storage[STORAGE_KEY] = _cache_storage(MOCKED_DEVICE_INFO)
+
+    with mocked_viomi_device() as send, patch(
+        "custom_components.xiaomi_viomi.PatchedViomiVacuum"
+    ) as device_class:
+        await async_setup_component(hass, DOMAIN, CONFIG)
+        await hass.async_block_till_done()
+
+        state = hass.states.get(get_entity_id())
+        assert state
+        assert state.state == STATE_DOCKED
+
+    # The validated device is handed over instead of creating another one
+    device_class.assert_not_called()
+    # Info is only refreshed once, in the background
+    commands = [call.args[0] for call in send.call_args_list]
+    assert commands.count("miIO.info") == 1
+
+
+async def test_background_refresh_failure_keeps_cache(
+    hass: HomeAssistant, hass_storage
+):
+    hass_storage[STORAGE_KEY] = _cache_storage(
+        {**MOCKED_DEVICE_INFO, "fw_ver": "3.5.3_0017"}
+    )
+
+    with mocked_viomi_device() as send:
+        original = send.side_effect
+
+        def _send(command, parameters=None):
+            if command == "miIO.info":
+                raise DeviceException("unreachable")
+            return original(command, parameters)
+
+        send.side_effect = _send
+        await async_setup_component(hass, DOMAIN, CONFIG)
+        await hass.async_block_till_done()
+
+        assert hass.states.get(get_entity_id()).state == STATE_DOCKED
+
+    cache = await async_get_device_info_cache(hass)
+    info = cache.get(TEST_HOST, TEST_TOKEN)
+    assert info is not None
+    assert info.firmware_version == "3.5.3_0017"
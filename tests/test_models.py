@@ -0,0 +1,30 @@
+"""Test the Xiaomi Viomi model tables."""
+import pytest
+
+from custom_components.xiaomi_viomi.models import (
+    DEFAULT_PROFILE,
+    MODEL_STY02YM,
+    MODEL_STYJ02YM,
+    MODEL_VIOMI_SE,
+    get_model_profile,
+)
+
+
+@pytest.mark.parametrize("model", [MODEL_STYJ02YM, MODEL_STY02YM, MODEL_VIOMI_SE])
+def test_model_profile(model):
+    profile = get_model_profile(model)
+
+    assert profile.fan_speed_list == ("Silent", "Standard", "Medium", "Turbo")
+    assert profile.fan_speeds["Turbo"] == 3
+    assert profile.fan_speeds_reverse[3] == "Turbo"
+    assert profile.water_grades_reverse[12] == "Medium"
+
+
+def test_model_profile_unknown_model():
+    assert get_model_profile("viomi.vacuum.unknown") is DEFAULT_PROFILE
+    assert get_model_profile(None) is DEFAULT_PROFILE
+
+
+def test_model_profile_immutable():
+    with pytest.raises(TypeError):
+        DEFAULT_PROFILE.fan_speeds["Max"] = 4
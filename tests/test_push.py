@@ -0,0 +1,65 @@
+"""Test the Xiaomi Viomi pushed state updates."""
+from homeassistant.components.vacuum import STATE_CLEANING, STATE_DOCKED
+from homeassistant.core import HomeAssistant
+
+from custom_components.xiaomi_viomi.const import (
+    DOMAIN,
+    PUSH_UPDATE_INTERVAL,
+    UPDATE_INTERVAL_IDLE,
+)
+from custom_components.xiaomi_viomi.push import parse_props
+from tests import get_entity_id, get_mocked_entry, mocked_viomi_device
+
+
+def test_parse_props():
+    assert parse_props({"run_state": 3, "unknown": 1}) == {"run_state": 3}
+    assert parse_props([["run_state", 3], ["battary_life", 90], "garbage"]) == {
+        "run_state": 3,
+        "battary_life": 90,
+    }
+    assert parse_props(None) == {}
+
+
+async def test_push_updates_state(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device() as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        transport = coordinator.device.transport
+        assert hass.states.get(get_entity_id()).state == STATE_DOCKED
+        assert coordinator.update_interval == UPDATE_INTERVAL_IDLE
+
+        mock_device_send.reset_mock()
+        transport.notification_listener(
+            {"id": 1, "method": "props", "params": {"run_state": 3}}
+        )
+        await hass.async_block_till_done()
+
+        # Applied without polling the device
+        assert hass.states.get(get_entity_id()).state == STATE_CLEANING
+        mock_device_send.assert_not_called()
+        assert coordinator.push.pushes == 1
+
+        # Polls are rare while the device pushes its state
+        await coordinator.async_refresh()
+        assert coordinator.update_interval == PUSH_UPDATE_INTERVAL
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert transport.notification_listener is None
+
+
+async def test_no_pushes_polled_as_usual(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        await coordinator.async_refresh()
+        assert not coordinator.push.is_alive
+        assert coordinator.update_interval == UPDATE_INTERVAL_IDLE
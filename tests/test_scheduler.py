@@ -0,0 +1,102 @@
+"""Test the Xiaomi Viomi poll scheduler."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+
+from custom_components.xiaomi_viomi.const import (
+    CONF_MAX_CONCURRENT_POLLS,
+    DATA_SCHEDULER,
+    DOMAIN,
+)
+from custom_components.xiaomi_viomi.scheduler import (
+    ViomiPollScheduler,
+    async_get_scheduler,
+)
+from tests import get_mocked_entry, mocked_viomi_device
+
+INTERVAL = timedelta(seconds=20)
+
+
+async def test_scheduler_spreads_phases(hass: HomeAssistant):
+    scheduler = ViomiPollScheduler()
+    for key in ("a", "b", "c", "d"):
+        scheduler.async_register(key)
+
+    now = dt_util.utc_from_timestamp(1_000_003.5)
+    with patch("homeassistant.util.dt.utcnow", return_value=now):
+        polls = [scheduler.next_poll(key, INTERVAL) for key in ("a", "b", "c", "d")]
+
+    phases = sorted(poll.timestamp() % 20 for poll in polls)
+    assert phases == [0, 5, 10, 15]
+    for poll in polls:
+        assert INTERVAL / 2 <= poll - now <= INTERVAL * 1.5
+
+    # Phases are spread again when a device goes away
+    scheduler.async_unregister("b")
+    scheduler.async_unregister("d")
+    with patch("homeassistant.util.dt.utcnow", return_value=now):
+        phases = sorted(
+            scheduler.next_poll(key, INTERVAL).timestamp() % 20 for key in ("a", "c")
+        )
+    assert phases == [0, 10]
+
+    # Unknown devices keep the plain interval
+    with patch("homeassistant.util.dt.utcnow", return_value=now):
+        assert scheduler.next_poll("x", INTERVAL) == now + INTERVAL
+
+
+async def test_scheduler_bounds_concurrency(hass: HomeAssistant):
+    scheduler = ViomiPollScheduler(max_concurrent=2)
+    running = 0
+    peak = 0
+
+    async def poll(key):
+        nonlocal running, peak
+        async with scheduler.async_poll(key):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    keys = [f"device_{index}" for index in range(6)]
+    for key in keys:
+        scheduler.async_register(key)
+    await asyncio.gather(*(poll(key) for key in keys))
+
+    assert peak == 2
+    assert all(scheduler.costs[key].polls == 1 for key in keys)
+    assert all(scheduler.costs[key].last > 0 for key in keys)
+    assert scheduler.total_cost == sum(cost.total for cost in scheduler.costs.values())
+
+
+async def test_scheduler_configured_limit(hass: HomeAssistant):
+    assert await async_setup_component(
+        hass, DOMAIN, {DOMAIN: {CONF_MAX_CONCURRENT_POLLS: 2}}
+    )
+    assert hass.data[DATA_SCHEDULER].max_concurrent == 2
+    assert async_get_scheduler(hass) is hass.data[DATA_SCHEDULER]
+
+
+async def test_scheduler_tracks_entries(hass: HomeAssistant):
+    entries = [get_mocked_entry(), get_mocked_entry()]
+    with mocked_viomi_device():
+        for entry in entries:
+            entry.add_to_hass(hass)
+            await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        scheduler = async_get_scheduler(hass)
+        for entry in entries:
+            assert scheduler.costs[entry.entry_id].polls == 1
+            coordinator = hass.data[DOMAIN][entry.entry_id]
+            assert coordinator.scheduler is scheduler
+
+        await hass.config_entries.async_unload(entries[0].entry_id)
+        await hass.async_block_till_done()
+
+        assert entries[0].entry_id not in scheduler.costs
+        assert entries[1].entry_id in scheduler.costs
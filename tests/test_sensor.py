@@ -0,0 +1,87 @@
+"""Test the Xiaomi Viomi diagnostic sensors."""
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry
+from homeassistant.helpers.entity import EntityCategory
+from miio import DeviceException
+
+from custom_components.xiaomi_viomi.const import DOMAIN
+from custom_components.xiaomi_viomi.metrics import ViomiMetrics
+from tests import (
+    MOCKING_SEND_METHOD,
+    get_mocked_entry,
+    mocked_viomi_device,
+)
+
+POLL_DURATION = "sensor.mocked_vacuum_poll_duration"
+LAST_SUCCESS = "sensor.mocked_vacuum_last_successful_poll"
+ROUND_TRIP_TIME = "sensor.mocked_vacuum_round_trip_time"
+
+
+def test_metrics_histogram():
+    metrics = ViomiMetrics()
+    for duration in (0.05, 0.1, 0.3, 30):
+        metrics.record_poll(duration, success=duration < 10)
+
+    histogram = metrics.as_dict()["poll_duration_histogram"]
+    assert histogram["0.1"] == 2
+    assert histogram["0.5"] == 1
+    assert histogram["inf"] == 1
+    assert sum(histogram.values()) == metrics.polls == 4
+    assert metrics.poll_failures == 1
+    assert metrics.last_success is not None
+
+
+async def test_metric_sensors_disabled_by_default(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    # Metrics change with every poll, they aren't recorded unless enabled
+    registry = entity_registry.async_get(hass)
+    for entity_id in (POLL_DURATION, LAST_SUCCESS, ROUND_TRIP_TIME):
+        entity = registry.async_get(entity_id)
+        assert entity.disabled
+        assert entity.entity_category == EntityCategory.DIAGNOSTIC
+        assert hass.states.get(entity_id) is None
+
+
+async def test_metric_sensors(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    registry = entity_registry.async_get(hass)
+    for key in ("poll_duration", "last_successful_poll"):
+        registry.async_get_or_create(
+            "sensor",
+            DOMAIN,
+            f"{entry.unique_id}_{key}",
+            suggested_object_id=f"mocked_vacuum_{key}",
+        )
+
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    state = hass.states.get(POLL_DURATION)
+    assert float(state.state) >= 0
+    assert state.attributes["polls"] == 1
+    assert state.attributes["failures"] == 0
+    last_success = hass.states.get(LAST_SUCCESS).state
+
+    # Metrics stay available while the device is unreachable
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    with patch(
+        MOCKING_SEND_METHOD,
+        new_callable=AsyncMock,
+        side_effect=DeviceException("No response from the device"),
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+    state = hass.states.get(POLL_DURATION)
+    assert state.attributes["polls"] == 2
+    assert state.attributes["failures"] == 1
+    assert hass.states.get(LAST_SUCCESS).state == last_success
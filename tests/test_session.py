@@ -0,0 +1,79 @@
+"""Test the persistent miIO session cache."""
+from datetime import datetime
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.xiaomi_viomi.const import DATA_SESSIONS, DOMAIN
+from custom_components.xiaomi_viomi.session import STORAGE_KEY, _session_key
+from tests import TEST_HOST, TEST_TOKEN, get_mocked_entry, mocked_viomi_device
+
+
+async def test_session_restored_from_storage(hass: HomeAssistant, hass_storage):
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            _session_key(TEST_HOST, TEST_TOKEN): {
+                "device_id": "0badf00d",
+                "ts_offset": 120.0,
+                "message_id": 42,
+            }
+        },
+    }
+
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    transport = hass.data[DOMAIN][entry.entry_id].device.transport
+    assert transport.device_id == 0x0BADF00D
+
+    session = transport.session
+    assert session["message_id"] == 142
+    assert 119 < session["ts_offset"] < 122
+
+
+async def test_session_saved_after_handshake(hass: HomeAssistant, hass_storage):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    cache = hass.data[DATA_SESSIONS]
+    transport = hass.data[DOMAIN][entry.entry_id].device.transport
+    transport.restore_session(
+        {"device_id": "0badf00d", "ts_offset": 0.0, "message_id": 1}
+    )
+    with patch.object(cache._store, "async_delay_save") as delay_save:
+        transport._update_session(datetime.utcnow())
+        delay_save.assert_not_called()
+
+        transport.session_listener()
+        delay_save.assert_called_once()
+
+    data = delay_save.call_args[0][0]()
+    assert data[_session_key(TEST_HOST, TEST_TOKEN)]["message_id"] == 101
+
+
+async def test_session_saved_for_new_address(hass: HomeAssistant, hass_storage):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    cache = hass.data[DATA_SESSIONS]
+    device = hass.data[DOMAIN][entry.entry_id].device
+    device.transport.restore_session(
+        {"device_id": "0badf00d", "ts_offset": 0.0, "message_id": 1}
+    )
+    with patch.object(cache._store, "async_delay_save") as delay_save:
+        device.set_host("1.1.1.2")
+        delay_save.assert_called_once()
+
+    data = delay_save.call_args[0][0]()
+    assert data[_session_key("1.1.1.2", TEST_TOKEN)]["device_id"] == "0badf00d"
@@ -0,0 +1,42 @@
+"""Test the Xiaomi Viomi status snapshot."""
+from datetime import timedelta
+
+from miio.integrations.vacuum.viomi.viomivacuum import (
+    ViomiVacuumState,
+    ViomiVacuumStatus,
+)
+
+from custom_components.xiaomi_viomi.status import ViomiStatusSnapshot
+from tests import MOCKED_DEVICE_STATE
+
+
+def test_status_snapshot_matches_miio():
+    snapshot = ViomiStatusSnapshot(MOCKED_DEVICE_STATE)
+    status = ViomiVacuumStatus(MOCKED_DEVICE_STATE)
+
+    assert snapshot.state == status.state == ViomiVacuumState.Docked
+    assert snapshot.error_code == status.error_code
+    assert snapshot.error == status.error
+    assert snapshot.battery == status.battery
+    assert snapshot.suction_grade == status.fanspeed.value
+    assert snapshot.clean_time == status.clean_time == timedelta(minutes=20)
+    assert snapshot.clean_area == status.clean_area
+    assert snapshot.mop_installed == status.mop_installed
+    assert snapshot.is_on == status.is_on
+    assert snapshot.charging == status.charging
+    assert snapshot.has_map == status.has_map
+
+
+def test_status_snapshot_compare():
+    snapshot = ViomiStatusSnapshot(MOCKED_DEVICE_STATE)
+
+    assert snapshot == ViomiStatusSnapshot(dict(MOCKED_DEVICE_STATE))
+    assert snapshot != ViomiStatusSnapshot({**MOCKED_DEVICE_STATE, "battary_life": 1})
+    assert snapshot.data["run_state"] == 5
+
+
+def test_status_snapshot_unknown_state():
+    snapshot = ViomiStatusSnapshot({**MOCKED_DEVICE_STATE, "run_state": 9000})
+
+    assert snapshot.state == ViomiVacuumState.Unknown
+    assert snapshot.run_state == 9000
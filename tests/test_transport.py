@@ -0,0 +1,272 @@
+"""Test the asyncio miIO transport against a fake device on localhost."""
+import asyncio
+import struct
+from datetime import datetime
+
+import pytest
+import pytest_socket
+from construct.core import ChecksumError
+from miio import DeviceError, DeviceException
+from miio.protocol import Message
+from pytest_homeassistant_custom_component.plugins import disable_socket
+
+from custom_components.xiaomi_viomi.transport import MiioTransport
+from tests import TEST_TOKEN
+
+
+@pytest.fixture(autouse=True)
+def localhost_socket():
+    """Allow sockets, the fake device listens on localhost."""
+    pytest_socket.enable_socket()
+    yield
+    disable_socket(allow_unix_socket=True)
+
+
+DEVICE_ID = bytes.fromhex("0badf00d")
+
+
+class FakeDevice(asyncio.DatagramProtocol):
+    """Answer miIO hello and requests with a canned result."""
+
+    def __init__(self, token=TEST_TOKEN, result=None, error=None, stale=False):
+        self.token = bytes.fromhex(token)
+        self.result = result
+        self.error = error
+        self.stale = stale
+        self.silent = False
+        self.delay = None
+        self.hellos = 0
+        self.requests = []
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def _reply(self, request_id, addr, **payload):
+        header = {
+            "length": 0,
+            "unknown": 0,
+            "device_id": DEVICE_ID,
+            "ts": datetime.utcnow(),
+        }
+        message = {
+            "data": {"value": {"id": request_id, **payload}},
+            "header": {"value": header},
+            "checksum": 0,
+        }
+        self.transport.sendto(Message.build(message, token=self.token), addr)
+
+    def datagram_received(self, data, addr):
+        if self.silent:
+            return
+
+        if len(data) == 32:
+            self.hellos += 1
+            ts = int(datetime.utcnow().timestamp())
+            hello = struct.pack(">HHI4sI", 0x2131, 32, 0, DEVICE_ID, ts)
+            self.transport.sendto(hello + b"\xff" * 16, addr)
+            return
+
+        request = Message.parse(data, token=bytes.fromhex(TEST_TOKEN)).data.value
+        self.requests.append(request)
+
+        if self.delay is None:
+            self._answer(request, addr)
+            return
+
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        asyncio.get_running_loop().call_later(
+            self.delay(request), self._answer_delayed, request, addr
+        )
+
+    def _answer_delayed(self, request, addr):
+        self.outstanding -= 1
+        self._answer(request, addr)
+
+    def _answer(self, request, addr):
+        if self.stale:
+            self._reply(request["id"] - 1, addr, result=["stale"])
+        if self.error:
+            self._reply(request["id"], addr, error=self.error)
+        else:
+            self._reply(request["id"], addr, result=self.result or request["params"])
+
+
+async def _start(device, **kwargs):
+    loop = asyncio.get_running_loop()
+    server, _ = await loop.create_datagram_endpoint(
+        lambda: device, local_addr=("127.0.0.1", 0)
+    )
+    transport = MiioTransport("127.0.0.1", TEST_TOKEN, **kwargs)
+    transport.port = server.get_extra_info("sockname")[1]
+    return server, transport
+
+
+async def test_transport_send():
+    device = FakeDevice(result=[100, 5])
+    server, transport = await _start(device)
+    try:
+        assert await transport.async_send("get_prop", ["a", "b"]) == [100, 5]
+        assert await transport.async_send("get_prop", ["a", "b"]) == [100, 5]
+    finally:
+        transport.close()
+        server.close()
+
+    assert device.hellos == 1
+    assert [r["params"] for r in device.requests] == [["a", "b"], ["a", "b"]]
+    assert transport.device_id == int.from_bytes(DEVICE_ID, "big")
+
+
+async def test_transport_drops_stale_responses():
+    device = FakeDevice(result=["fresh"], stale=True)
+    server, transport = await _start(device)
+    try:
+        assert await transport.async_send("get_prop", ["a"]) == ["fresh"]
+    finally:
+        transport.close()
+        server.close()
+
+
+async def test_transport_invalid_token():
+    device = FakeDevice(token="aa" * 16, result=[])
+    server, transport = await _start(device)
+    try:
+        with pytest.raises(DeviceException) as exc_info:
+            await transport.async_send("miIO.info")
+    finally:
+        transport.close()
+        server.close()
+
+    assert isinstance(exc_info.value.__cause__, ChecksumError)
+
+
+async def test_transport_device_error():
+    device = FakeDevice(error={"code": -5001, "message": "invalid_arg"})
+    server, transport = await _start(device)
+    try:
+        with pytest.raises(DeviceError):
+            await transport.async_send("get_prop", ["a"])
+    finally:
+        transport.close()
+        server.close()
+
+
+async def test_transport_timeout():
+    device = FakeDevice(result=[])
+    server, transport = await _start(device, timeout=0.05, retry_count=1)
+    try:
+        await transport.async_send("get_prop", ["a"])
+
+        device.silent = True
+        with pytest.raises(DeviceException):
+            await transport.async_send("get_prop", ["a"])
+    finally:
+        transport.close()
+        server.close()
+
+    metrics = transport.metrics
+    # Hello and the first request were answered
+    assert metrics.requests == 2
+    assert metrics.rtt_last is not None
+    assert metrics.bytes_sent > 0
+    assert metrics.bytes_received > 0
+    # The request and both hellos of the handshake before its retry timed out
+    assert metrics.retries == 1
+    assert metrics.timeouts == 3
+
+
+async def test_transport_probe():
+    device = FakeDevice(result=[1])
+    server, transport = await _start(device, timeout=0.05, retry_count=3)
+    try:
+        assert await transport.async_probe()
+        assert transport.device_id == int.from_bytes(DEVICE_ID, "big")
+        # The probe started a session, the request needs no handshake
+        assert await transport.async_send("get_prop", ["a"]) == [1]
+        assert device.hellos == 1
+
+        # A single hello, no retries
+        device.silent = True
+        assert not await transport.async_probe()
+        assert device.hellos == 1
+    finally:
+        transport.close()
+        server.close()
+
+
+async def test_transport_notification():
+    device = FakeDevice(result=[1])
+    server, transport = await _start(device)
+    notifications = []
+    transport.notification_listener = notifications.append
+    try:
+        await transport.async_send("get_prop", ["a"])
+        addr = ("127.0.0.1", transport._transport.get_extra_info("sockname")[1])
+
+        device._reply(42, addr, method="props", params={"run_state": 3})
+        await asyncio.sleep(0.05)
+    finally:
+        transport.close()
+        server.close()
+
+    assert notifications == [{"id": 42, "method": "props", "params": {"run_state": 3}}]
+    # The notification was acknowledged
+    assert device.requests[-1] == {"id": 42, "result": ["ok"]}
+
+
+async def test_transport_restored_session_skips_handshake():
+    device = FakeDevice(result=[1])
+    server, transport = await _start(device)
+    try:
+        await transport.async_send("get_prop", ["a"])
+        session = transport.session
+        transport.close()
+
+        restored = MiioTransport("127.0.0.1", TEST_TOKEN)
+        restored.port = transport.port
+        restored.restore_session(session)
+        assert await restored.async_send("get_prop", ["a"]) == [1]
+    finally:
+        restored.close()
+        server.close()
+
+    assert device.hellos == 1
+    assert device.requests[1]["id"] > device.requests[0]["id"]
+
+
+async def test_transport_session_listener_called_on_handshake():
+    device = FakeDevice(result=[1])
+    server, transport = await _start(device)
+    calls = []
+    transport.session_listener = lambda: calls.append(transport.session)
+    try:
+        await transport.async_send("get_prop", ["a"])
+        await transport.async_send("get_prop", ["a"])
+    finally:
+        transport.close()
+        server.close()
+
+    assert len(calls) == 1
+    assert calls[0]["device_id"] == DEVICE_ID.hex()
+
+
+async def test_transport_pipelined_requests():
+    device = FakeDevice()
+    # Later requests are answered first
+    device.delay = lambda request: 0.2 - request["params"][0] / 100
+    server, transport = await _start(device, max_in_flight=4)
+    try:
+        await transport.async_send("get_prop", [0])
+
+        results = await asyncio.gather(
+            *(transport.async_send("get_prop", [index]) for index in range(8))
+        )
+    finally:
+        transport.close()
+        server.close()
+
+    assert results == [[index] for index in range(8)]
+    assert device.max_outstanding == 4
@@ -1,8 +1,12 @@
 """Test sensor for simple integration."""
+import asyncio
 from typing import Optional
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from homeassistant.components.vacuum import (
+    ATTR_BATTERY_LEVEL,
+    ATTR_FAN_SPEED,
     DOMAIN,
     SERVICE_CLEAN_SPOT,
     SERVICE_LOCATE,
@@ -13,14 +17,36 @@ from homeassistant.components.vacuum import (
     SERVICE_START,
     SERVICE_START_PAUSE,
     SERVICE_STOP,
+    STATE_CLEANING,
     STATE_DOCKED,
+    STATE_IDLE,
+    STATE_PAUSED,
+    STATE_RETURNING,
 )
 from homeassistant.const import SERVICE_TOGGLE, SERVICE_TURN_OFF, SERVICE_TURN_ON
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, State
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_component import async_update_entity
 from miio.integrations.vacuum.viomi.viomivacuum import ViomiVacuumSpeed
+from pytest_homeassistant_custom_component.common import mock_restore_cache
 
+from custom_components.xiaomi_viomi.const import (
+    DEFAULT_MAX_PROPERTIES,
+    DEVICE_PROPERTIES_FAST,
+)
+from custom_components.xiaomi_viomi.const import DOMAIN as VIOMI_DOMAIN
+from custom_components.xiaomi_viomi.const import (
+    SERVICE_CLEAN_SEGMENT,
+    SERVICE_CLEAN_ZONE,
+    SERVICE_GOTO,
+)
 from custom_components.xiaomi_viomi.const import SUPPORT_VIOMI as SUPPORT_FEATURES
-from tests import get_entity_id, get_mocked_entry, mocked_viomi_device
+from tests import (
+    MOCKING_SEND_METHOD,
+    get_entity_id,
+    get_mocked_entry,
+    mocked_viomi_device,
+)
 
 
 async def test_vacuum_state(hass: HomeAssistant):
@@ -40,6 +66,40 @@ async def test_vacuum_state(hass: HomeAssistant):
         assert state.attributes["supported_features"] == SUPPORT_FEATURES
 
 
+@pytest.mark.parametrize(
+    "max_properties,expected_chunk",
+    [(None, DEFAULT_MAX_PROPERTIES), (4, 4), (1, 1)],
+)
+async def test_vacuum_batched_status(
+    hass: HomeAssistant, max_properties, expected_chunk
+):
+    entry = get_mocked_entry()
+    with mocked_viomi_device(max_properties=max_properties) as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        mock_device_send.reset_mock()
+
+        entity_id = get_entity_id()
+        await async_update_entity(hass, entity_id)
+
+        state = hass.states.get(entity_id)
+        assert state
+        assert state.state == STATE_DOCKED
+
+        # The chunk size found during the first poll is reused without retries
+        requested = [
+            call.args[1]
+            for call in mock_device_send.mock_calls
+            if call.args and call.args[0] == "get_prop"
+        ]
+        assert sum(map(len, requested)) == len(DEVICE_PROPERTIES_FAST)
+        assert max(map(len, requested)) == min(
+            expected_chunk, len(DEVICE_PROPERTIES_FAST)
+        )
+
+
 test_service_data = [
     (SERVICE_TURN_ON, "set_mode_withroom", [0, 1, 0]),
     (SERVICE_TURN_OFF, "set_mode", [0, 0]),
@@ -207,3 +267,208 @@ async def test_vacuum_error_state(hass: HomeAssistant, error_code, error_value):
 
         assert state
         assert state.attributes["error"] == error_value
+
+
+@pytest.mark.parametrize(
+    "service,data,attribute,expected",
+    [
+        (SERVICE_START, {}, "state", STATE_CLEANING),
+        (SERVICE_PAUSE, {}, "state", STATE_PAUSED),
+        (SERVICE_STOP, {}, "state", STATE_IDLE),
+        (SERVICE_RETURN_TO_BASE, {}, "state", STATE_RETURNING),
+        (SERVICE_SET_FAN_SPEED, {"fan_speed": "Turbo"}, "fan_speed", "Turbo"),
+    ],
+)
+async def test_vacuum_optimistic_state(
+    hass: HomeAssistant, service, data, attribute, expected
+):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        entity_id = get_entity_id()
+        coordinator = hass.data[VIOMI_DOMAIN][entry.entry_id]
+        before = hass.states.get(entity_id)
+
+        # Hold back the refresh that follows the command
+        with patch.object(coordinator.commands, "_on_drained", AsyncMock()):
+            await hass.services.async_call(
+                DOMAIN, service, {"entity_id": entity_id, **data}, blocking=True
+            )
+            await hass.async_block_till_done()
+
+        state = hass.states.get(entity_id)
+        if attribute == "state":
+            assert state.state == expected
+        else:
+            assert state.attributes[attribute] == expected
+
+        # The device did not change, so the next poll reverts the state
+        await coordinator.async_refresh()
+        state = hass.states.get(entity_id)
+        assert state.state == before.state == STATE_DOCKED
+        assert state.attributes["fan_speed"] == before.attributes["fan_speed"]
+
+
+async def test_vacuum_writes_only_changes(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device():
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        coordinator = hass.data[VIOMI_DOMAIN][entry.entry_id]
+        with patch.object(
+            Entity, "async_write_ha_state", autospec=True
+        ) as write_ha_state:
+
+            def vacuum_writes():
+                # Diagnostic sensors are written with every poll
+                return [
+                    call
+                    for call in write_ha_state.mock_calls
+                    if call.args[0].entity_id == get_entity_id()
+                ]
+
+            # Same snapshot, nothing is written
+            await coordinator.async_refresh()
+            assert len(vacuum_writes()) == 0
+
+            with mocked_viomi_device({"battary_life": 42}):
+                await coordinator.async_refresh()
+                assert len(vacuum_writes()) == 1
+
+                await coordinator.async_refresh()
+                assert len(vacuum_writes()) == 1
+
+
+@pytest.mark.parametrize(
+    "service,data,calls",
+    [
+        (
+            SERVICE_CLEAN_SEGMENT,
+            {"segments": ["kitchen", 13]},
+            [("set_mode_withroom", [0, 1, 2, 11, 13])],
+        ),
+        (
+            SERVICE_CLEAN_ZONE,
+            {"zone": [[-1, 0.5, 1, 2]]},
+            [
+                ("set_zone", [1, "0_0_4_-1.0_0.5_1.0_0.5_1.0_2.0_-1.0_2.0"]),
+                ("set_mode", [3, 1]),
+            ],
+        ),
+        (
+            SERVICE_GOTO,
+            {"x_coord": 1.5, "y_coord": -2},
+            [("set_pointclean", [1, 1.5, -2.0])],
+        ),
+    ],
+)
+async def test_vacuum_area_services(hass: HomeAssistant, service, data, calls):
+    entry = get_mocked_entry()
+    with mocked_viomi_device() as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        mock_device_send.reset_mock()
+
+        await hass.services.async_call(
+            VIOMI_DOMAIN,
+            service,
+            {"entity_id": get_entity_id(), **data},
+            blocking=True,
+        )
+
+        sent = [call.args for call in mock_device_send.mock_calls]
+        for call in calls:
+            assert call in sent
+
+
+async def test_vacuum_clean_segment_rooms_cached(hass: HomeAssistant):
+    entry = get_mocked_entry()
+    with mocked_viomi_device() as mock_device_send:
+        entry.add_to_hass(hass)
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        async def clean(segments):
+            await hass.services.async_call(
+                VIOMI_DOMAIN,
+                SERVICE_CLEAN_SEGMENT,
+                {"entity_id": get_entity_id(), "segments": segments},
+                blocking=True,
+            )
+
+        def schedule_requests():
+            return [call.args[0] for call in mock_device_send.mock_calls].count(
+                "get_ordertime"
+            )
+
+        await clean(["Kitchen"])
+        await clean(["Bedroom"])
+        assert schedule_requests() == 1
+
+        # A new map invalidates the room list
+        coordinator = hass.data[VIOMI_DOMAIN][entry.entry_id]
+        with mocked_viomi_device({"has_newmap": 0}) as mock_device_send:
+            await coordinator.async_refresh()
+            await clean(["Kitchen"])
+            assert schedule_requests() == 1
+
+            # Unknown rooms are not sent
+            mock_device_send.reset_mock()
+            await clean(["Garage"])
+            assert "set_mode_withroom" not in [
+                call.args[0] for call in mock_device_send.mock_calls
+            ]
+
+
+async def test_vacuum_restores_state_until_first_poll(hass: HomeAssistant):
+    mock_restore_cache(
+        hass,
+        [
+            State(
+                get_entity_id(),
+                STATE_CLEANING,
+                {ATTR_BATTERY_LEVEL: 42, ATTR_FAN_SPEED: "Turbo", "status": "cleaning"},
+            )
+        ],
+    )
+    entry = get_mocked_entry()
+    entry.add_to_hass(hass)
+
+    release = asyncio.Event()
+    with mocked_viomi_device() as mock_device_send:
+        answer = mock_device_send.side_effect
+
+        async def slow_device(*args):
+            await release.wait()
+            return answer(*args)
+
+        with patch(MOCKING_SEND_METHOD, side_effect=slow_device):
+            # Setup doesn't wait for the device
+            assert await asyncio.wait_for(
+                hass.config_entries.async_setup(entry.entry_id), 1
+            )
+            # Platforms are set up in the background as well
+            for _ in range(100):
+                state = hass.states.get(get_entity_id())
+                if state is not None:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert state.state == STATE_CLEANING
+            assert state.attributes[ATTR_BATTERY_LEVEL] == 42
+            assert state.attributes[ATTR_FAN_SPEED] == "Turbo"
+            assert state.attributes["status"] == "cleaning"
+
+            release.set()
+            await hass.async_block_till_done()
+
+    state = hass.states.get(get_entity_id())
+    assert state.state == STATE_DOCKED
+    assert state.attributes[ATTR_BATTERY_LEVEL] == 100